@@ -25,7 +25,9 @@ from . create_category_ops  import CreateCategoryOperator
 from . exporter_ops         import UseObjectNameOperator, OverwriteObjectExporterOperator, TexturePackSelectionOperator,ObjectExporterOperator
 from . importer_ops         import (AppendObjectOperator, LinkObjectOperator, 
                                         SetMaterialOperator, AppendMaterialOperator, OpenObjectOperator, OpenMaterialOperator)
-from . render_previews_ops  import ModalTimerOperator, RenderPreviewsOperator, RenderAllPreviewsOperator   
+from . render_previews_ops  import (ModalTimerOperator, RenderPreviewsOperator, RenderStalePreviewsOperator, RenderAllPreviewsOperator,
+                                        CancelRenderJobOperator, CancelRenderQueueOperator, ResumeRenderQueueOperator,
+                                        DiscardRenderQueueOperator)
 from . generate_ops         import GeneratePBROperator, GenerateImageOperator, ExportPBROperator, ExportMaterialOperator             
 from . node_importer_ops    import NodeImporter   
 from . ao_curv_calc_ops     import BakeAoMapOperator, CurvatureMapOperator, AoNodeOperator, CurvatureNodeOperator, MapGenerateUV, UseObjectNameForMap
@@ -35,11 +37,37 @@ from . tools_ops            import (DX2OGLConverterOperator, GenerateTwoLayerTex
                                         ImportExtMusgrave, ImportExtVoronoi, ImportMixNoise,
                                         ImportScalarMix, ImportIntensityVisualizer, ImportScalarMapper,
                                         ImportNormalDirection, ImportSlice)             
-from . support_ops          import RefreshObjectPreviews, ReRenderObjectPreview, RefreshMaterialPreviews, ReRenderMaterialPreview, RemoveAsset                                        
+from . support_ops          import (RefreshObjectPreviews, ReRenderObjectPreview, RefreshMaterialPreviews, ReRenderMaterialPreview, RemoveAsset,
+                                        BackfillMetadata, PreviewPage)                                        
 from . utils                import (categories, categories_enum, ASSET_TYPE_OBJECT, ASSET_TYPE_MATERIAL,
                                         ASSET_TYPE_NODES, ASSET_TYPE_NODES_MATERIALS)
 from . icon_helper          import IconHelper
+from . library_watcher      import LibraryWatcher
+from . preview_loader       import PreviewLoader
+from . panel_cache          import PanelCache
 
+# 0.2.1
+#   - Persistent asset catalog (<root>/.asset_wizard), only changed directories are rescanned
+#   - Material names of .blend files are cached, libraries are only opened again if modified
+#   - Datablock names are read directly from the .blend block headers (no library load)
+#   - Library is watched (inotify or polling), externally added assets show up automatically
+#   - Category structure is expanded on demand, enum lists are cached between redraws
+#   - Library wide search in Asset Wizard Manager
+#   - Exported objects get a metadata sidecar (.meta.json), searchable with e.g. tris<10k, tex:rust
+#   - Lower memory use on large libraries (compact catalog records, shared asset table)
+#   - Previews are loaded from downscaled thumbnails (128/256/512 px) matching the preview scale
+#   - Previews are loaded in the background, placeholders are shown until ready
+#   - Previews of recently shown categories are cached (Preview cache preference)
+#   - Large categories are shown in pages of 200 previews
+#   - Optional thumbnail packs (one file per category), fewer file accesses on network storage
+#   - Render stale: only previews of assets modified after their preview was rendered
+#   - Exporter and map generator panels don't access files or walk node trees on redraw
+#   - Node Wizard libraries are listed from a manifest, the .blend is only read if it changed
+#   - Identical previews are stored once, the placeholder icon is shared by all missing previews
+#   - Previews are rendered by several Blender processes in parallel (Render processes preference)
+#   - Render processes stay running between jobs, previews of exported assets are rendered sooner
+#   - Render queue: no duplicate jobs, exported assets and the shown category first, jobs can be canceled
+#   - Render queue is journaled, unfinished renders can be resumed after a restart or crash
 # 0.2.0
 #   - New version number scheme
 #   - Render ALL fixed
@@ -167,7 +195,12 @@ ops = [
     OpenMaterialOperator,
     ModalTimerOperator,
     RenderPreviewsOperator,
+    RenderStalePreviewsOperator,
     RenderAllPreviewsOperator,
+    CancelRenderJobOperator,
+    CancelRenderQueueOperator,
+    ResumeRenderQueueOperator,
+    DiscardRenderQueueOperator,
     GeneratePBROperator, 
     GenerateImageOperator, 
     ExportPBROperator,
@@ -198,7 +231,9 @@ ops = [
     ReRenderObjectPreview,
     RefreshMaterialPreviews,
     ReRenderMaterialPreview,
+    PreviewPage,
     RemoveAsset,
+    BackfillMetadata,
 ]
 
 def register():
@@ -216,6 +251,9 @@ def register():
 
     Properties.initialize()
 
+    LibraryWatcher.start()
+    PanelCache.start()
+
     # On Linux, guarantee curvature has execute rights.
     if platform.system() == "Linux":
         os.chmod(
@@ -226,6 +264,10 @@ def register():
         )
 
 def unregister():
+    LibraryWatcher.shutdown()
+    PreviewLoader.shutdown()
+    PanelCache.shutdown()
+
     Properties.cleanup()
 
     IconHelper.dispose()
@@ -21,6 +21,7 @@ from bpy.props              import StringProperty, IntProperty, FloatProperty, B
 
 from . properties           import Properties
 from . node_utils           import NodeUtils
+from . panel_cache          import PanelCache
 
 class BakeAoMapOperator(Operator):
     """
@@ -200,6 +201,7 @@ class BakeAoMapOperator(Operator):
 
         # Do the bake.
         self.bake(context.active_object)
+        PanelCache.invalidate("map_files")
 
         return {'FINISHED'}
 
@@ -288,6 +290,7 @@ class CurvatureMapOperator(Operator):
             self.report({'ERROR'}, "Generation failed, see console")
 
         os.unlink(json_file)
+        PanelCache.invalidate("map_files")
 
         return {'FINISHED'}
 
@@ -0,0 +1,161 @@
+# Copyright (C) 2019 h0bB1T
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+#
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import json, os, re
+
+from typing                 import List, Tuple
+
+from . catalog              import Catalog, cache_folder, write_json_atomic
+from . common_utils         import metadata_file, METADATA_EXT
+
+# Filter expressions in search queries, e.g. "tris<10k", "size>=2m", "tex:rust", "mat:metal".
+NUMERIC_FILTER = re.compile(r"^(tris|verts|objects|size)(<=|>=|<|>|=)(\d+(?:\.\d+)?)([km]?)$", re.IGNORECASE)
+TEXT_FILTER = re.compile(r"^(tex|mat):(.+)$", re.IGNORECASE)
+
+NUMERIC_FIELDS = {
+    "tris": "triangles",
+    "verts": "vertices",
+    "objects": "objects",
+    "size": "file_size",
+}
+
+TEXT_FIELDS = {
+    "tex": "textures",
+    "mat": "materials",
+}
+
+OPERATORS = {
+    "<": lambda a, b: a < b,
+    ">": lambda a, b: a > b,
+    "<=": lambda a, b: a <= b,
+    ">=": lambda a, b: a >= b,
+    "=": lambda a, b: a == b,
+}
+
+
+def parse_filters(query: str) -> Tuple[str, List[tuple]]:
+    """
+    Split query into remaining text and a list of metadata filters.
+    """
+    text, filters = [], []
+    for token in query.split():
+        m = NUMERIC_FILTER.match(token)
+        if m:
+            value = float(m.group(3)) * { "": 1, "k": 1000, "m": 1000000 }[m.group(4).lower()]
+            filters.append((NUMERIC_FIELDS[m.group(1).lower()], OPERATORS[m.group(2)], value))
+            continue
+        m = TEXT_FILTER.match(token)
+        if m:
+            filters.append((TEXT_FIELDS[m.group(1).lower()], None, m.group(2).lower()))
+            continue
+        text.append(token)
+    return (" ".join(text), filters)
+
+
+def metadata_matches(metadata: dict, filters: List[tuple]) -> bool:
+    """
+    Check if metadata passes all filters. Assets without metadata never match.
+    """
+    if not metadata:
+        return False
+    for field, op, value in filters:
+        if op:
+            if not op(metadata.get(field, 0), value):
+                return False
+        elif not any(value in os.path.basename(v).lower() for v in metadata.get(field, [])):
+            return False
+    return True
+
+
+class MetadataIndex:
+    """
+    Aggregates the metadata sidecars of one asset type, persisted in the cache
+    folder. A sidecar is only read again if its mtime (from catalog) changed.
+    records = { rel_sidecar_path: [mtime_ns, metadata] }
+    """
+    instances = {}
+
+    def __init__(self, catalog: Catalog):
+        self.catalog = catalog
+        self.records = {}
+        self.generation = None
+
+
+    @staticmethod
+    def get(catalog: Catalog):
+        key = (catalog.root, catalog.asset_type)
+        if key not in MetadataIndex.instances:
+            MetadataIndex.instances[key] = MetadataIndex(catalog)
+            MetadataIndex.instances[key].load()
+        return MetadataIndex.instances[key]
+
+
+    def index_file(self) -> str:
+        return os.path.join(cache_folder(self.catalog.root), f"metadata_{self.catalog.asset_type}.json")
+
+
+    def load(self):
+        try:
+            with open(self.index_file(), "r", encoding="utf-8") as f:
+                self.records = json.load(f)
+        except (OSError, ValueError):
+            self.records = {}
+
+
+    def refresh(self):
+        """
+        Read changed sidecars, drop vanished ones. Only done if the catalog changed.
+        """
+        if self.generation == self.catalog.generation:
+            return
+        self.generation = self.catalog.generation
+
+        modified = False
+        seen = set()
+        for folder in self.catalog.folders:
+            for name, (_, mtime) in self.catalog.files(folder, (METADATA_EXT, )).items():
+                rel = os.path.join(folder, name)
+                seen.add(rel)
+                record = self.records.get(rel)
+                if record and record[0] == mtime:
+                    continue
+                try:
+                    with open(os.path.join(self.catalog.base_path(), rel), "r", encoding="utf-8") as f:
+                        self.records[rel] = [mtime, json.load(f)]
+                    modified = True
+                except (OSError, ValueError):
+                    pass
+
+        for rel in [ r for r in self.records if r not in seen ]:
+            del self.records[rel]
+            modified = True
+
+        if modified:
+            try:
+                write_json_atomic(self.index_file(), self.records)
+            except OSError as ex:
+                print(f"Can't write metadata index: {self.index_file()} ({ex})")
+
+
+    def lookup(self, asset: str) -> dict:
+        """
+        Return metadata of the given asset file (absolute path), None if not available.
+        """
+        base = os.path.join(self.catalog.base_path(), "")
+        sidecar = metadata_file(asset)
+        rel = sidecar[len(base):] if sidecar.startswith(base) else os.path.relpath(sidecar, base)
+        record = self.records.get(rel)
+        return record[1] if record else None
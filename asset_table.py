@@ -0,0 +1,109 @@
+# Copyright (C) 2019 h0bB1T
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+#
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import os, sys
+
+from typing                 import Tuple
+
+
+class AssetTable:
+    """
+    Session wide table of asset entries (path/abc.blend or path/abc.blend::Material).
+    Entries get a stable integer ID, they are stored as (folder index, file name, material)
+    so the (long) folder path exists only once. IDs are never reused in a session.
+    """
+    folders = []
+    folder_ids = {}
+    entries = []
+    entry_ids = {}
+
+    @staticmethod
+    def folder_id(folder: str) -> int:
+        fid = AssetTable.folder_ids.get(folder)
+        if fid is None:
+            fid = len(AssetTable.folders)
+            AssetTable.folders.append(sys.intern(folder))
+            AssetTable.folder_ids[AssetTable.folders[fid]] = fid
+        return fid
+
+
+    @staticmethod
+    def add(folder: str, name: str, material: str = "") -> int:
+        """
+        Return ID of the entry, register it if unknown.
+        """
+        key = (AssetTable.folder_id(folder), sys.intern(name), sys.intern(material))
+        aid = AssetTable.entry_ids.get(key)
+        if aid is None:
+            aid = len(AssetTable.entries)
+            AssetTable.entries.append(key)
+            AssetTable.entry_ids[key] = aid
+        return aid
+
+
+    @staticmethod
+    def id_of(entry: str) -> int:
+        """
+        Return ID of an entry string.
+        """
+        imp, _, material = entry.partition("::")
+        folder, name = os.path.split(imp)
+        return AssetTable.add(folder, name, material)
+
+
+    @staticmethod
+    def key_of(entry: str) -> str:
+        """
+        Return compact identifier of an entry string, used in enum items.
+        """
+        return str(AssetTable.id_of(entry))
+
+
+    @staticmethod
+    def entry_of_key(key: str) -> str:
+        """
+        Return entry string of an identifier, "" if it's not a valid one.
+        """
+        try:
+            return AssetTable.entry_of(int(key))
+        except (ValueError, IndexError):
+            return ""
+
+
+    @staticmethod
+    def parts(aid: int) -> Tuple[str, str, str]:
+        """
+        Return (folder, file name, material) of the entry.
+        """
+        fid, name, material = AssetTable.entries[aid]
+        return (AssetTable.folders[fid], name, material)
+
+
+    @staticmethod
+    def entry_of(aid: int) -> str:
+        """
+        Return entry string of the ID.
+        """
+        folder, name, material = AssetTable.parts(aid)
+        entry = os.path.join(folder, name)
+        return f"{entry}::{material}" if material else entry
+
+
+    @staticmethod
+    def label_of(aid: int) -> str:
+        _, name, material = AssetTable.parts(aid)
+        label = os.path.splitext(name)[0]
+        return f"{label}:{material}" if material else label
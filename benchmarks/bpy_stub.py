@@ -0,0 +1,177 @@
+# Copyright (C) 2019 h0bB1T
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+#
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+# Minimal stand-in for bpy (and mathutils), just enough to import and run
+# the scanning and parsing code outside of Blender. Only used by the benchmarks,
+# timings of preview loading are meaningless with it.
+import shutil, struct, sys, types
+
+
+class ImagePreview:
+    counter = 0
+
+    def __init__(self):
+        ImagePreview.counter += 1
+        self.icon_id = ImagePreview.counter
+        self.image_size = (0, 0)
+        self.image_pixels_float = []
+        self.icon_size = (0, 0)
+        self.icon_pixels_float = []
+
+
+class ImagePreviewCollection(dict):
+    def load(self, name, filepath, filetype, force_reload=False):
+        self[name] = ImagePreview()
+        return self[name]
+
+
+    def new(self, name):
+        self[name] = ImagePreview()
+        return self[name]
+
+
+    def clear(self):
+        super().clear()
+
+
+    def close(self):
+        self.clear()
+
+
+class LibraryLoader:
+    """
+    bpy.data.libraries.load replacement, no library contains anything.
+    """
+    def __init__(self, filepath, link=False):
+        self.filepath = filepath
+
+
+    def __enter__(self):
+        data = types.SimpleNamespace(materials=[], objects=[], node_groups=[])
+        return (data, types.SimpleNamespace())
+
+
+    def __exit__(self, *args):
+        return False
+
+
+class Image:
+    """
+    Loaded image, scale() doesn't touch the pixels, save() copies the source.
+    """
+    def __init__(self, filepath):
+        with open(filepath, "rb") as f:
+            self.size = list(struct.unpack(">II", f.read(24)[16:24]))
+        self.source = filepath
+        self.filepath_raw = filepath
+        self.file_format = 'PNG'
+
+
+    def scale(self, width, height):
+        self.size = [ width, height ]
+
+
+    def save(self):
+        shutil.copyfile(self.source, self.filepath_raw)
+
+
+class Images(list):
+    def load(self, filepath, check_existing=False):
+        self.append(Image(filepath))
+        return self[-1]
+
+
+    def remove(self, image):
+        super().remove(image)
+
+
+class Timers:
+    def __init__(self):
+        self.functions = []
+
+    def register(self, function, first_interval=0, persistent=False):
+        self.functions.append(function)
+
+    def unregister(self, function):
+        self.functions.remove(function)
+
+    def is_registered(self, function):
+        return function in self.functions
+
+
+def install():
+    """
+    Register stub modules in sys.modules, returns the bpy stub.
+    """
+    bpy = types.ModuleType("bpy")
+
+    props = types.ModuleType("bpy.props")
+    for name in (
+        "BoolProperty", "CollectionProperty", "EnumProperty", "FloatProperty",
+        "IntProperty", "PointerProperty", "StringProperty"
+    ):
+        setattr(props, name, lambda *args, **kwargs: None)
+
+    bpy_types = types.ModuleType("bpy.types")
+    for name in (
+        "AddonPreferences", "Context", "Menu", "NodeTree", "Object", "Operator",
+        "Panel", "PropertyGroup", "UIList", "WindowManager"
+    ):
+        setattr(bpy_types, name, type(name, (), {}))
+
+    previews = types.ModuleType("bpy.utils.previews")
+    previews.new = ImagePreviewCollection
+    previews.remove = lambda collection: collection.close()
+
+    utils = types.ModuleType("bpy.utils")
+    utils.previews = previews
+    utils.register_class = utils.unregister_class = lambda cls: None
+
+    bpy.props, bpy.types, bpy.utils = props, bpy_types, utils
+    bpy.path = types.SimpleNamespace(clean_name=lambda name: name, abspath=lambda path: path)
+    bpy.app = types.SimpleNamespace(
+        version=(2, 83, 0),
+        version_string="stub",
+        binary_path="blender",
+        background=True,
+        timers=Timers(),
+        handlers=types.SimpleNamespace(depsgraph_update_post=[], load_post=[])
+    )
+    bpy.data = types.SimpleNamespace(
+        libraries=types.SimpleNamespace(load=LibraryLoader),
+        images=Images(),
+        filepath=""
+    )
+    bpy.context = types.SimpleNamespace(
+        preferences=types.SimpleNamespace(addons={}, view=types.SimpleNamespace(ui_scale=1.0)),
+        window_manager=types.SimpleNamespace(windows=[]),
+        area=None
+    )
+    bpy.msgbus = types.SimpleNamespace(subscribe_rna=lambda **kwargs: None, clear_by_owner=lambda owner: None)
+    bpy.ops = types.SimpleNamespace()
+
+    mathutils = types.ModuleType("mathutils")
+    mathutils.Vector = tuple
+
+    sys.modules.update({
+        "bpy": bpy,
+        "bpy.props": props,
+        "bpy.types": bpy_types,
+        "bpy.utils": utils,
+        "bpy.utils.previews": previews,
+        "mathutils": mathutils,
+    })
+    return bpy
@@ -0,0 +1,316 @@
+# Copyright (C) 2019 h0bB1T
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+#
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+# Benchmarks of library scanning and entry parsing on synthetic asset trees.
+#
+# Outside of Blender (bpy stub, preview loading not measured meaningfully):
+#   python benchmarks/run_benchmarks.py --scales 1000 10000 --output result.json
+# Inside of Blender (real bpy.utils.previews):
+#   blender --background --factory-startup --python benchmarks/run_benchmarks.py -- --scales 1000
+# Compare against an earlier result:
+#   python benchmarks/run_benchmarks.py --compare base.json --output new.json
+import argparse, contextlib, importlib, json, os, platform, shutil, statistics, struct, sys, tempfile, time, types, zlib
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDON_DIR = os.path.dirname(BENCH_DIR)
+
+# Name the add-on is imported as, must not clash with an installed copy.
+PACKAGE = "asset_wizard_bench"
+
+# Increase if generated trees change, older trees are generated again.
+TREE_VERSION = 1
+
+ASSETS_PER_CATEGORY = 50
+TOP_CATEGORIES = 10
+
+# Number of previews looked up by the thumbnail_locate benchmark.
+LOCATED_PREVIEWS = 100
+
+
+def png(size: int) -> bytes:
+    """
+    Encode a size x size RGB gradient as PNG.
+    """
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    rows = b"".join(
+        b"\0" + b"".join(bytes((x * 255 // size, y * 255 // size, 128)) for x in range(size))
+            for y in range(size)
+    )
+    return b"\x89PNG\r\n\x1a\n" + \
+        chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)) + \
+        chunk(b"IDAT", zlib.compress(rows)) + \
+        chunk(b"IEND", b"")
+
+
+def blend(code: bytes, names) -> bytes:
+    """
+    Smallest .blend the header reader accepts: one ID block per name (8 byte
+    pointers, little endian). Blender itself can't open these.
+    """
+    data = b"BLENDER-v280"
+    for name in names:
+        block = bytes(32) + (code + name.encode()).ljust(66, b"\0")
+        data += struct.pack("<4siQii", code + b"\0\0", len(block), 1, 0, 1) + block
+    return data + struct.pack("<4siQii", b"ENDB", 0, 0, 0, 0)
+
+
+def generate(root: str, scale: int, preview_size: int):
+    """
+    Create asset tree with scale objects (4/5 .blend, 1/5 .fbx) and scale/10
+    material libraries (every 4th containing multiple materials) in nested categories.
+    9/10 of the assets have a preview.
+    """
+    marker = os.path.join(root, "tree.json")
+    params = { "version": TREE_VERSION, "scale": scale, "preview_size": preview_size }
+    try:
+        with open(marker, "r") as f:
+            if json.load(f) == params:
+                return
+    except (OSError, ValueError):
+        pass
+
+    shutil.rmtree(root, ignore_errors=True)
+    image = png(preview_size)
+    object_blend = blend(b"OB", ["Object"])
+
+    def category(i: int, count: int) -> str:
+        # Two levels: top/sub, about ASSETS_PER_CATEGORY assets per sub category.
+        subs = max(1, count // ASSETS_PER_CATEGORY // TOP_CATEGORIES)
+        c = i // ASSETS_PER_CATEGORY
+        return os.path.join(f"top_{c % TOP_CATEGORIES}", f"sub_{(c // TOP_CATEGORIES) % subs}")
+
+    for i in range(scale):
+        folder = os.path.join(root, "objects", category(i, scale))
+        os.makedirs(folder, exist_ok=True)
+        base = os.path.join(folder, f"asset_{i}")
+        if i % 5 == 4:
+            with open(base + ".fbx", "wb") as f:
+                f.write(b"Kaydara FBX Binary  \0")
+        else:
+            with open(base + ".blend", "wb") as f:
+                f.write(object_blend)
+        if i % 10 != 9:
+            with open(base + ".png", "wb") as f:
+                f.write(image)
+
+    materials = max(1, scale // 10)
+    for i in range(materials):
+        folder = os.path.join(root, "materials", category(i, materials))
+        os.makedirs(folder, exist_ok=True)
+        base = os.path.join(folder, f"material_{i}")
+        names = [ f"Mat_{i}_{m}" for m in range(3) ] if i % 4 == 0 else [ f"Mat_{i}" ]
+        with open(base + ".blend", "wb") as f:
+            f.write(blend(b"MA", names))
+        for name in names if len(names) > 1 else []:
+            with open(f"{base}__{name}.png", "wb") as f:
+                f.write(image)
+        if len(names) == 1:
+            with open(base + ".png", "wb") as f:
+                f.write(image)
+
+    with open(marker, "w") as f:
+        json.dump(params, f)
+
+
+def load_addon(stubbed: bool):
+    """
+    Import the add-on modules needed (not the add-on itself, so nothing is registered).
+    """
+    if stubbed:
+        sys.path.insert(0, BENCH_DIR)
+        import bpy_stub
+        bpy_stub.install()
+
+    package = types.ModuleType(PACKAGE)
+    package.__path__ = [ ADDON_DIR ]
+    sys.modules[PACKAGE] = package
+    return types.SimpleNamespace(
+        catalog=importlib.import_module(f"{PACKAGE}.catalog"),
+        blend_info=importlib.import_module(f"{PACKAGE}.blend_info"),
+        preferences=importlib.import_module(f"{PACKAGE}.preferences"),
+        utils=importlib.import_module(f"{PACKAGE}.utils"),
+        preview_helper=importlib.import_module(f"{PACKAGE}.preview_helper"),
+        preview_parsers=importlib.import_module(f"{PACKAGE}.preview_parsers"),
+        thumbnail_cache=importlib.import_module(f"{PACKAGE}.thumbnail_cache"),
+    )
+
+
+def reset(addon):
+    """
+    Forget all in memory state, on-disk caches are kept.
+    """
+    addon.catalog.Catalog.instances.clear()
+    addon.blend_info.BlendInfoCache.instances.clear()
+    for asset_type in addon.utils.CategoriesCache.cache:
+        addon.utils.CategoriesCache.cache[asset_type] = None
+    addon.utils.CategoriesCache.memo.clear()
+
+
+def measure(function, repeat: int, setup=None) -> dict:
+    """
+    Run function repeat times (setup before each, not timed), return timings in seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return { "min": min(times), "median": statistics.median(times), "runs": repeat }
+
+
+def run_scale(addon, root: str, repeat: int) -> dict:
+    utils = addon.utils
+    CategoriesCache = utils.CategoriesCache
+    OBJ, MAT = utils.ASSET_TYPE_OBJECT, utils.ASSET_TYPE_MATERIAL
+    cache = os.path.join(root, addon.catalog.CACHE_FOLDER)
+
+    def cold():
+        reset(addon)
+        shutil.rmtree(cache, ignore_errors=True)
+
+    def expand():
+        CategoriesCache.rec_scan_structure(OBJ).get_entries(True, True)
+
+    def entries(asset_type):
+        return [
+            e for category, _, _ in CategoriesCache.categories_enum(asset_type, True, False)
+                for e in utils.parse_entry_list(asset_type, "" if category == "<ROOT>" else category)
+        ]
+
+    def parse_collections(asset_type):
+        for category, _, _ in CategoriesCache.categories_enum(asset_type, True, False):
+            lst = addon.preview_helper.CollectionList(
+                addon.preview_parsers.CollectionImageParser(),
+                (asset_type, "" if category == "<ROOT>" else category, 0)
+            )
+            lst.parser.parse(lst)
+            lst.reset()
+
+    results = {}
+    results["catalog_scan_cold"] = measure(lambda: CategoriesCache.update_cache(OBJ), repeat, cold)
+    results["catalog_refresh_warm"] = measure(lambda: CategoriesCache.update_cache(OBJ), repeat, lambda: reset(addon))
+
+    reset(addon)
+    CategoriesCache.update_cache(OBJ)
+    CategoriesCache.update_cache(MAT)
+    results["rec_scan_structure"] = measure(expand, repeat)
+
+    def bump():
+        CategoriesCache.version[OBJ] += 1
+    results["categories_enum_cold"] = measure(lambda: CategoriesCache.categories_enum(OBJ, True, False), repeat, bump)
+    results["categories_enum_warm"] = measure(lambda: CategoriesCache.categories_enum(OBJ, True, False), repeat)
+
+    results["parse_entry_list_objects"] = measure(lambda: entries(OBJ), repeat)
+
+    def forget_blend_info():
+        addon.blend_info.BlendInfoCache.instances.clear()
+        try:
+            os.remove(os.path.join(cache, "blend_info.json"))
+        except OSError:
+            pass
+    results["parse_entry_list_materials_cold"] = measure(lambda: entries(MAT), repeat, forget_blend_info)
+    results["parse_entry_list_materials_warm"] = measure(lambda: entries(MAT), repeat)
+
+    all_entries = entries(OBJ) + entries(MAT)
+    results["split_entry"] = measure(lambda: [ utils.split_entry(e) for e in all_entries ], repeat)
+    results["collection_image_parser"] = measure(lambda: (parse_collections(OBJ), parse_collections(MAT)), repeat)
+
+    # Worker thread part of preview loading, decoding is done by Blender on the main thread.
+    previews = [ utils.split_entry(e)[1] for e in all_entries[:LOCATED_PREVIEWS] ]
+    def locate():
+        for p in previews:
+            addon.thumbnail_cache.ThumbnailCache.locate(root, p, addon.thumbnail_cache.THUMB_SIZES[0])
+    results["thumbnail_locate"] = measure(locate, repeat)
+
+    results["entries"] = len(all_entries)
+    return results
+
+
+def compare(base: dict, result: dict):
+    """
+    Print ratio (new / base) of median timings for all benchmarks in both results.
+    """
+    print(f"{'scale':>8} {'benchmark':<36} {'base':>10} {'new':>10} {'ratio':>7}")
+    for scale, benchmarks in result["scales"].items():
+        for name, timing in benchmarks.items():
+            old = base.get("scales", {}).get(scale, {}).get(name)
+            if isinstance(timing, dict) and isinstance(old, dict) and old["median"] > 0:
+                print(f"{scale:>8} {name:<36} {old['median']:10.4f} {timing['median']:10.4f} {timing['median'] / old['median']:7.2f}")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Asset Wizard scanning benchmarks")
+    parser.add_argument("--scales", type=int, nargs="+", default=[ 1000, 10000, 100000 ])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "asset_wizard_bench"),
+        help="Generated trees are kept here and reused")
+    parser.add_argument("--preview-size", type=int, default=256)
+    parser.add_argument("--output", help="Write JSON result to file (default: stdout)")
+    parser.add_argument("--compare", help="JSON result of an earlier run")
+    args = parser.parse_args(argv)
+
+    try:
+        import bpy
+        stubbed = False
+    except ImportError:
+        stubbed = True
+    addon = load_addon(stubbed)
+
+    prefs = types.SimpleNamespace(
+        root="", show_blend=True, show_fbx=True, use_category_icons=False, preview_scale=1.0,
+        preview_cache_size=256, use_thumbnail_packs=False
+    )
+    addon.preferences.PreferencesPanel.get = staticmethod(lambda: prefs)
+
+    bpy = sys.modules["bpy"]
+    result = {
+        "bpy": "stub" if stubbed else bpy.app.version_string,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "scales": {}
+    }
+    for scale in args.scales:
+        root = os.path.join(args.workdir, str(scale))
+        start = time.perf_counter()
+        generate(root, scale, args.preview_size)
+        print(f"Tree {scale}: {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+        prefs.root = root
+        # Keep diagnostic prints of the add-on out of the JSON output.
+        with contextlib.redirect_stdout(sys.stderr):
+            result["scales"][str(scale)] = run_scale(addon, root, args.repeat)
+        reset(addon)
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            compare(json.load(f), result)
+
+
+if __name__ == "__main__":
+    # Blender passes script arguments after "--".
+    main(sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:])
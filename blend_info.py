@@ -0,0 +1,147 @@
+# Copyright (C) 2019 h0bB1T
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+#
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import bpy, json, os, time
+
+from typing                 import List
+from . catalog              import cache_folder, write_json_atomic
+from . blend_reader         import read_id_names, BlendReadError
+
+# Increase if the on-disk layout changes, older caches are dropped then.
+BLEND_INFO_VERSION = 1
+
+# Min. seconds between writes while libraries are listed category by category.
+SAVE_INTERVAL = 5.0
+
+
+def read_blend_names(blend: str, kind: str) -> List[str]:
+    """
+    Return names of all datablocks of the given kind (materials, objects, node_groups, ..).
+    The block headers are read directly, the library is only opened by Blender
+    if that fails (e.g. unsupported compression).
+    """
+    try:
+        return read_id_names(blend, (kind, ))[kind]
+    except BlendReadError:
+        pass
+
+    with bpy.data.libraries.load(blend, link=False) as (data_from, data_to):
+        return list(getattr(data_from, kind))
+
+
+class BlendInfoCache:
+    """
+    Persistent cache of datablock names contained in .blend files, so libraries
+    must not be opened again just to list their content. Entries are keyed by path
+    (relative to the cache root if possible) and become invalid if size or mtime
+    of the file changes.
+    files = { path: [size, mtime_ns, { kind: [name, ..] }] }
+    """
+    instances = {}
+
+    def __init__(self, root: str):
+        self.root = root
+        self.files = {}
+        self.loaded = False
+        self.dirty = False
+        self.saved = 0.0
+
+
+    @staticmethod
+    def get(root: str):
+        """
+        Return (shared) cache for the given asset root.
+        """
+        if root not in BlendInfoCache.instances:
+            BlendInfoCache.instances[root] = BlendInfoCache(root)
+        return BlendInfoCache.instances[root]
+
+
+    def cache_file(self) -> str:
+        return os.path.join(cache_folder(self.root), "blend_info.json")
+
+
+    def load(self):
+        self.loaded = True
+        try:
+            with open(self.cache_file(), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == BLEND_INFO_VERSION:
+                self.files = data["files"]
+        except (OSError, ValueError, KeyError):
+            self.files = {}
+
+
+    def save(self, interval: float = 0.0):
+        """
+        Write cache if modified since last save, but not within interval
+        seconds after the last write.
+        """
+        if not self.dirty or time.monotonic() - self.saved < interval:
+            return
+        self.dirty = False
+        self.saved = time.monotonic()
+        try:
+            write_json_atomic(self.cache_file(), {
+                "version": BLEND_INFO_VERSION,
+                "files": self.files
+            })
+        except OSError as ex:
+            print(f"Can't write blend info: {self.cache_file()} ({ex})")
+
+
+    def key(self, blend: str) -> str:
+        """
+        Files below the root are stored relative, so the cache stays valid
+        if the library is mounted at different locations.
+        """
+        try:
+            rel = os.path.relpath(blend, self.root)
+        except ValueError: # Different drive (Windows).
+            return blend
+        return blend if rel.startswith("..") else rel.replace(os.sep, "/")
+
+
+    def names(self, blend: str, kind: str) -> List[str]:
+        """
+        Return names of all datablocks of the given kind in the .blend file,
+        the library is only opened if the file changed since it was cached.
+        """
+        if not self.loaded:
+            self.load()
+
+        st = os.stat(blend)
+        key = self.key(blend)
+        entry = self.files.get(key)
+        if not entry or entry[0] != st.st_size or entry[1] != st.st_mtime_ns:
+            entry = [st.st_size, st.st_mtime_ns, {}]
+            self.files[key] = entry
+
+        if kind not in entry[2]:
+            entry[2][kind] = read_blend_names(blend, kind)
+            self.dirty = True
+
+        return entry[2][kind]
+
+
+    def cached_names(self, blend: str, kind: str) -> List[str]:
+        """
+        Return cached names without checking the file, None if unknown.
+        """
+        if not self.loaded:
+            self.load()
+        entry = self.files.get(self.key(blend))
+        return entry[2].get(kind) if entry else None
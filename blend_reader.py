@@ -0,0 +1,180 @@
+# Copyright (C) 2019 h0bB1T
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+#
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+# Minimal .blend reader, lists datablock (ID) names without bpy. Only the
+# block headers and the leading bytes of ID blocks are read, all other data
+# is skipped. Works on plain and gzip compressed (compress=True) files.
+#
+# File layout:
+#   Header:  "BLENDER" + pointer size ('_' = 4, '-' = 8) + endian ('v' = little, 'V' = big) + "280"
+#            "BLENDER17-01v0500" (Blender 5.0+, 8 byte pointers, little endian, large block headers)
+#   Blocks:  BHead + data, until "ENDB"
+#   BHead:   code[4], len (int), old pointer, SDNAnr (int), nr (int)
+#   BHead 5: code[4], SDNAnr (int), old (uint64), len (int64), nr (int64)
+#   ID:      next, prev, newid, lib, [asset_data], name[66/258] (name starts with the 2 char ID code)
+import gzip, struct
+
+from typing                 import Dict, List
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# bpy.data collection name -> ID code.
+ID_CODES = {
+    "objects": b"OB",
+    "meshes": b"ME",
+    "materials": b"MA",
+    "node_groups": b"NT",
+    "collections": b"GR",
+    "images": b"IM",
+    "textures": b"TE",
+    "worlds": b"WO",
+    "scenes": b"SC",
+    "lights": b"LA",
+    "cameras": b"CA",
+}
+
+# Longest ID name (Blender 5.0+), shorter names are NUL terminated anyway.
+MAX_ID_NAME = 258
+
+
+class BlendReadError(Exception):
+    pass
+
+
+class BlendFileReader:
+    """
+    Streams the block headers of an opened .blend file.
+    """
+    def __init__(self, f):
+        self.f = f
+        self.read_header()
+
+
+    def read_exact(self, size: int) -> bytes:
+        data = self.f.read(size)
+        if len(data) != size:
+            raise BlendReadError("Unexpected end of file")
+        return data
+
+
+    def skip(self, size: int):
+        if size > 0:
+            self.f.seek(size, 1)
+
+
+    def read_header(self):
+        header = self.read_exact(12)
+        if not header.startswith(b"BLENDER"):
+            raise BlendReadError("Not a .blend file")
+
+        if header[7:9].isdigit():
+            # Blender 5.0+: "BLENDER" + header size + '-' + format version + endian + version.
+            size = int(header[7:9])
+            rest = header[9:] + self.read_exact(size - 12)
+            if rest[0:1] != b"-" or rest[3:4] not in (b"v", b"V"):
+                raise BlendReadError("Unknown .blend header")
+            self.pointer_size = 8
+            self.endian = "<" if rest[3:4] == b"v" else ">"
+            self.large_bhead = True
+        else:
+            if header[7:8] not in (b"_", b"-") or header[8:9] not in (b"v", b"V"):
+                raise BlendReadError("Unknown .blend header")
+            self.pointer_size = 4 if header[7:8] == b"_" else 8
+            self.endian = "<" if header[8:9] == b"v" else ">"
+            self.large_bhead = False
+
+        if self.large_bhead:
+            self.bhead = struct.Struct(self.endian + "4siQqq")
+        elif self.pointer_size == 4:
+            self.bhead = struct.Struct(self.endian + "4siIii")
+        else:
+            self.bhead = struct.Struct(self.endian + "4siQii")
+        self.pointer = struct.Struct(self.endian + ("I" if self.pointer_size == 4 else "Q"))
+
+
+    def blocks(self):
+        """
+        Yield (code, length) for each block, the caller must read or skip exactly length bytes.
+        """
+        while True:
+            fields = self.bhead.unpack(self.read_exact(self.bhead.size))
+            code = fields[0]
+            length = fields[3] if self.large_bhead else fields[1]
+            if code == b"ENDB":
+                return
+            if length < 0:
+                raise BlendReadError("Corrupt block header")
+            yield (code, length)
+
+
+    def id_name(self, code: bytes, data: bytes) -> str:
+        """
+        Extract the name from the leading bytes of an ID block. The offset of name
+        depends on the Blender version (asset_data pointer added in 3.0), the
+        2 char ID code identifies the right position. Returns None for linked IDs.
+        """
+        p = self.pointer_size
+        if self.pointer.unpack_from(data, 3 * p)[0] != 0: # ID.lib
+            return None
+        for offset in (4 * p, 5 * p):
+            if data[offset:offset + 2] == code[:2]:
+                name = data[offset + 2:offset + MAX_ID_NAME].split(b"\0", 1)[0]
+                return name.decode("utf-8", errors="replace")
+        return None
+
+
+    def id_names(self, kinds) -> Dict[str, List[str]]:
+        codes = { ID_CODES[k] + b"\0\0": k for k in kinds }
+        names = { k: [] for k in kinds }
+        head = 5 * self.pointer_size + MAX_ID_NAME
+        for code, length in self.blocks():
+            kind = codes.get(code)
+            if kind:
+                data = self.read_exact(min(length, head))
+                self.skip(length - len(data))
+                name = self.id_name(code, data)
+                if name is not None:
+                    names[kind].append(name)
+            else:
+                self.skip(length)
+        return names
+
+
+def open_blend(filename: str):
+    """
+    Open the .blend file, transparently decompressing gzip'ed ones.
+    """
+    with open(filename, "rb") as f:
+        magic = f.read(4)
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.open(filename, "rb")
+    if magic == ZSTD_MAGIC:
+        raise BlendReadError("Zstandard compressed .blend not supported")
+    return open(filename, "rb")
+
+
+def read_id_names(filename: str, kinds=tuple(ID_CODES.keys())) -> Dict[str, List[str]]:
+    """
+    Return { kind: [name, ..] } of the local datablocks of the given kinds
+    (bpy.data collection names, e.g. "materials", "node_groups").
+    Raises BlendReadError if the file can't be read.
+    """
+    try:
+        with open_blend(filename) as f:
+            return BlendFileReader(f).id_names(kinds)
+    except (OSError, EOFError, struct.error, gzip.BadGzipFile) as ex:
+        raise BlendReadError(str(ex))
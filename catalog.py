@@ -0,0 +1,260 @@
+# Copyright (C) 2019 h0bB1T
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+#
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+# No bpy in here, the catalog must be usable from worker threads and
+# outside of Blender (benchmarks).
+import json, os, sys
+
+from concurrent.futures     import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing                 import Dict, List, Tuple
+
+# Folder (below asset root) which holds all generated index data.
+CACHE_FOLDER = ".asset_wizard"
+
+# Increase if the on-disk layout changes, older catalogs are dropped then.
+CATALOG_VERSION = 4
+
+# All extensions recorded in the catalog, filtering is done on query.
+# Includes metadata sidecars (common_utils.METADATA_EXT) and previews.
+CATALOG_EXTENSIONS = (".blend", ".fbx", ".meta.json", ".png")
+
+# Number of directories listed concurrently. Scanning is bound by the
+# latency of the (network) filesystem, not by CPU.
+SCAN_WORKERS = 8
+
+
+def cache_folder(root: str) -> str:
+    """
+    Return folder for generated index data of the given asset root.
+    """
+    return os.path.join(root, CACHE_FOLDER)
+
+
+def write_json_atomic(filename: str, data):
+    """
+    Write data as compact JSON. A temporary file is used, so readers
+    (e.g. other Blender instances on a shared library) never see partial files.
+    """
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    tmp = f"{filename}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp, filename)
+
+
+def in_subtree(rel: str, top: str) -> bool:
+    """
+    Check if the folder rel is top itself or below it.
+    """
+    return top == "" or rel == top or rel.startswith(top + os.sep)
+
+
+class FolderRecord:
+    """
+    Index entry of a single folder. Names are interned, so they are shared with
+    all other users (e.g. the asset table) of the same names.
+    files = { name: (size, mtime_ns) }
+    """
+    __slots__ = ("mtime", "dirs", "files")
+
+    def __init__(self, mtime: int, dirs: List[str], files: Dict[str, Tuple[int, int]]):
+        self.mtime = mtime
+        self.dirs = dirs
+        self.files = files
+
+
+    def to_json(self) -> list:
+        return [ self.mtime, self.dirs, self.files ]
+
+
+    @staticmethod
+    def from_json(data: list):
+        mtime, dirs, files = data
+        return FolderRecord(
+            mtime,
+            [ sys.intern(d) for d in dirs ],
+            { sys.intern(name): tuple(stat) for name, stat in files.items() }
+        )
+
+
+class Catalog:
+    """
+    Persistent index of a single asset type tree (e.g. <root>/objects).
+    Stores for every folder (relative to the asset type folder) its mtime,
+    sub folders and files with size and mtime. On refresh only directories
+    whose mtime changed are listed again, all others are served from the index.
+    folders = { rel_path: FolderRecord }, on disk { rel_path: [mtime, dirs, files] }
+    """
+    instances = {}
+
+    def __init__(self, root: str, asset_type: str):
+        self.root = root
+        self.asset_type = asset_type
+        self.folders = {}
+        self.loaded = False
+        # Incremented on every modification, lets observers detect changes.
+        self.generation = 0
+
+
+    @staticmethod
+    def get(root: str, asset_type: str):
+        """
+        Return (shared) catalog for the given root and asset type.
+        """
+        key = (root, asset_type)
+        if key not in Catalog.instances:
+            Catalog.instances[key] = Catalog(root, asset_type)
+        return Catalog.instances[key]
+
+
+    def base_path(self) -> str:
+        return os.path.join(self.root, self.asset_type)
+
+
+    def index_file(self) -> str:
+        return os.path.join(cache_folder(self.root), f"catalog_{self.asset_type}.json")
+
+
+    def load(self):
+        """
+        Read index from disk, an unreadable or outdated index is simply ignored.
+        """
+        self.loaded = True
+        self.generation += 1
+        try:
+            with open(self.index_file(), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CATALOG_VERSION:
+                self.folders = {
+                    sys.intern(rel): FolderRecord.from_json(record) for rel, record in data["folders"].items()
+                }
+        except (OSError, ValueError, KeyError, TypeError):
+            self.folders = {}
+
+
+    def save(self):
+        """
+        Write index to disk. Failing is not fatal (e.g. read only library).
+        """
+        try:
+            write_json_atomic(self.index_file(), {
+                "version": CATALOG_VERSION,
+                "folders": { rel: record.to_json() for rel, record in self.folders.items() }
+            })
+        except OSError as ex:
+            print(f"Can't write catalog: {self.index_file()} ({ex})")
+
+
+    def scan_folder(self, rel: str, mtime: int) -> FolderRecord:
+        """
+        List a single folder, return its record. Uses the type information
+        of scandir, so only asset files need an additional stat.
+        """
+        dirs, files = [], {}
+        with os.scandir(os.path.join(self.base_path(), rel)) as it:
+            for e in it:
+                if e.name.startswith('.'):
+                    continue
+                if e.is_dir():
+                    dirs.append(sys.intern(e.name))
+                elif e.name.lower().endswith(CATALOG_EXTENSIONS) and e.is_file():
+                    st = e.stat()
+                    files[sys.intern(e.name)] = (st.st_size, st.st_mtime_ns)
+        dirs.sort()
+        return FolderRecord(mtime, dirs, dict(sorted(files.items())))
+
+
+    def refresh_folder(self, rel: str, record: FolderRecord, force: bool = False) -> Tuple[str, FolderRecord, bool]:
+        """
+        Refresh a single folder (no recursion), runs on a worker thread. With force,
+        it's scanned even if its mtime is unchanged (modified files don't change it).
+        Returns (rel, record, changed), record is None if the folder is gone.
+        """
+        try:
+            mtime = os.stat(os.path.join(self.base_path(), rel)).st_mtime_ns
+            if record and record.mtime == mtime and not force:
+                return (rel, record, False)
+            scanned = self.scan_folder(rel, mtime)
+            return (rel, scanned, not record or scanned.to_json() != record.to_json())
+        except OSError:
+            return (rel, None, False)
+
+
+    def refresh(self, rel: str = "", force: bool = False) -> List[str]:
+        """
+        Bring index up to date, returns list of changed folders. Only the given
+        folder and its sub folders are visited, sibling sub trees are walked
+        concurrently. With force, the given folder is scanned again even if its
+        mtime didn't change. The index is written to disk if anything changed.
+        """
+        if not self.loaded:
+            self.load()
+
+        seen, changed = set(), []
+        with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as pool:
+            pending = { pool.submit(self.refresh_folder, rel, self.folders.get(rel), force) }
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    folder, record, is_changed = future.result()
+                    if not record:
+                        continue
+
+                    seen.add(folder)
+                    if is_changed:
+                        self.folders[sys.intern(folder)] = record
+                        changed.append(folder)
+
+                    for d in record.dirs:
+                        sub = os.path.join(folder, d)
+                        pending.add(pool.submit(self.refresh_folder, sub, self.folders.get(sub)))
+
+        removed = [ f for f in self.folders if in_subtree(f, rel) and f not in seen ]
+        for f in removed:
+            del self.folders[f]
+
+        if changed or removed:
+            self.generation += 1
+            self.save()
+        return sorted(changed + removed)
+
+
+    def exists(self) -> bool:
+        return "" in self.folders
+
+
+    def subfolders(self, rel: str) -> List[str]:
+        """
+        Return names of sub folders of the given folder.
+        """
+        record = self.folders.get(rel)
+        return record.dirs if record else []
+
+
+    def files(self, rel: str, extensions: Tuple[str]) -> Dict[str, Tuple[int, int]]:
+        """
+        Return { name: (size, mtime) } of all files matching the extensions.
+        """
+        record = self.folders.get(rel)
+        if not record:
+            return {}
+        return {
+            name: stat for name, stat in record.files.items() if name.lower().endswith(extensions)
+        }
+
+
+    def file_count(self, rel: str, extensions: Tuple[str]) -> int:
+        return len(self.files(rel, extensions))
@@ -14,7 +14,14 @@
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
 
+import bpy, json, os
+
 from mathutils              import Vector
+from typing                 import List
+
+# Written next to exported assets: <asset>.blend.meta.json, <asset>.fbx.meta.json
+METADATA_EXT = ".meta.json"
+METADATA_VERSION = 1
 
 def calc_bounding_box(objects):
     """
@@ -48,4 +55,103 @@ def calc_bounding_box(objects):
     )
 
     return (bmin, bmax)
-    
\ No newline at end of file
+
+
+def textures_of_node_tree(nt: bpy.types.NodeTree):
+    """
+    Helper fpr textures_of_object(s).
+    """
+    r = []
+    for n in nt.nodes:
+        if n.bl_idname == 'ShaderNodeTexImage':
+            if n.image and n.image.filepath:
+                r.append(bpy.path.abspath(n.image.filepath))
+        elif n.bl_idname == 'ShaderNodeGroup' and n.node_tree:
+            r.extend(textures_of_node_tree(n.node_tree))
+    return r
+
+
+def textures_of_object(obj: bpy.types.Object):
+    """
+    Helper fpr textures_of_objects.
+    """
+    r = []
+    for ms in obj.material_slots:
+        if ms.material and ms.material.node_tree:
+            r.extend(textures_of_node_tree(ms.material.node_tree))
+    return r
+
+
+def textures_of_objects(objects: List[bpy.types.Object]):
+    """
+    Get all image textures used by all materials from all objects as set.
+    """
+    r = []
+    for o in objects:
+        r.extend(textures_of_object(o))
+    return set(r)
+
+
+def metadata_file(asset: str) -> str:
+    """
+    Return path of the metadata sidecar of an asset file. The asset's extension
+    is kept, so a .blend and an .fbx of the same name have their own sidecars.
+    """
+    return asset + METADATA_EXT
+
+
+def triangle_count(obj: bpy.types.Object) -> int:
+    """
+    Number of triangles of a mesh object (modifiers not applied).
+    """
+    if obj.type != 'MESH' or not obj.data:
+        return 0
+    polygons = obj.data.polygons
+    loops = [0] * len(polygons)
+    polygons.foreach_get("loop_total", loops)
+    return sum(loops) - 2 * len(polygons)
+
+
+def collect_metadata(objects: List[bpy.types.Object], asset: str) -> dict:
+    """
+    Create metadata record for the given objects, stored as asset file.
+    """
+    materials = { ms.material.name for o in objects for ms in o.material_slots if ms.material }
+    if objects:
+        bmin, bmax = calc_bounding_box(objects)
+        dimensions = [ round(bmax[i] - bmin[i], 6) for i in range(3) ]
+    else:
+        dimensions = [ 0, 0, 0 ]
+
+    return {
+        "version": METADATA_VERSION,
+        "objects": len(objects),
+        "vertices": sum(len(o.data.vertices) for o in objects if o.type == 'MESH' and o.data),
+        "triangles": sum(triangle_count(o) for o in objects),
+        "dimensions": dimensions,
+        "materials": sorted(materials),
+        "textures": sorted(textures_of_objects(objects)),
+        "file_size": os.path.getsize(asset) if os.path.exists(asset) else 0,
+        "blender": bpy.app.version_string,
+    }
+
+
+def write_metadata(asset: str, metadata: dict):
+    """
+    Write metadata sidecar of an asset. Replaced as a whole, so the folder
+    modification time changes and library watchers pick it up.
+    """
+    filename = metadata_file(asset)
+    with open(filename + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=4, separators=(',', ': '))
+    os.replace(filename + ".tmp", filename)
+
+
+def redraw_3d_views():
+    """
+    Force redraw of all 3D views (panels in the sidebar).
+    """
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
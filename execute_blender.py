@@ -16,8 +16,6 @@
 
 import bpy, subprocess, os
 
-from . utils                import split_entry
-
 # From asset-flinger
 # https://stackoverflow.com/questions/4417546/constantly-print-subprocess-output-while-process-is-running
 def execute_silent(cmd):
@@ -42,14 +40,28 @@ def execute(cmd):
     """
     return subprocess.Popen(cmd, universal_newlines=True)
 
-def execute_blender(args):
+def execute_piped(cmd):
+    """
+    Runs an external application with stdin/stdout connected to (line
+    buffered, text) pipes, for exchanging messages with it.
+    """
+    return subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        encoding="utf-8",
+        errors="replace",
+        bufsize=1
+    )
+
+def execute_blender(args, piped=False):
     """
     Execute Blender with given arguments.
     Returns the object to watch for completion.
     """
     args.insert(0, bpy.app.binary_path)
     print(" ".join(args))
-    return execute(args)
+    return execute_piped(args) if piped else execute(args)
 
 # blender --background --factory-startup --python fix_blend.py -- [Asset.blend] --pack X.png --pack Y.png ..
 def run_blend_fix(asset, pack):
@@ -71,22 +83,41 @@ def run_blend_fix(asset, pack):
     
     execute_blender(args).wait() # Wait for completion.
 
-def run_preview_render(asset_type, filename, engine):
+# blender --background --factory-startup --threads N preview.blend --python render_script.py -- --daemon
+def run_render_daemon(threads=0):
     """
-    Render a preview for the given .blend file.
-    Returns the object to watch for completion.
+    Start a Blender process, which renders the previews of jobs sent as
+    JSON lines to its stdin (see render_script.serve), until stdin is closed.
+    Returns the process, its stdin/stdout are pipes.
     """
     args = [
         "--background",
         "--factory-startup",
+        "--threads",
+        str(threads),
         os.path.join(os.path.dirname(__file__), "data", "preview.blend"),
         "--python",
         os.path.join(os.path.dirname(__file__), "render_script.py"),
         "--",
-        filename,
-        split_entry(filename)[1],
-        asset_type,
-        engine
+        "--daemon"
     ]
-    
+
+    return execute_blender(args, piped=True)
+
+
+# blender --background --factory-startup --python metadata_script.py -- [assets.json]
+def run_metadata_backfill(asset_list):
+    """
+    Write metadata sidecars for all assets listed in the given JSON file.
+    Returns the object to watch for completion.
+    """
+    args = [
+        "--background",
+        "--factory-startup",
+        "--python",
+        os.path.join(os.path.dirname(__file__), "metadata_script.py"),
+        "--",
+        asset_list
+    ]
+
     return execute_blender(args)
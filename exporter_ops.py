@@ -20,9 +20,10 @@ from bpy.types              import Operator
 from bpy.props              import StringProperty, BoolProperty
 
 from . utils                import textures_of_objects, blender_2_8x, export_file, ASSET_TYPE_OBJECT
-from . common_utils         import calc_bounding_box
+from . common_utils         import calc_bounding_box, collect_metadata, write_metadata
 from . properties           import Properties
 from . preferences          import PreferencesPanel
+from . render_queue         import PRIORITY_EXPORT
 from . execute_blender      import run_blend_fix
 
 class UseObjectNameOperator(Operator):
@@ -348,6 +349,12 @@ class ObjectExporterOperator(Operator, ExportObjectBase):
             self.export_fbx(path)
             self.report({'INFO'}, "FBX created.")
 
+        # Metadata sidecar for filtering (uses the exported names).
+        try:
+            write_metadata(path, collect_metadata(objects, path))
+        except OSError as ex:
+            self.report({'WARNING'}, f"Can't write metadata: {ex}")
+
         # Restore original state.
         self.restore_material_information(originalMat)
         self.restore_object_information(original)
@@ -358,7 +365,8 @@ class ObjectExporterOperator(Operator, ExportObjectBase):
         # Put onto render queue.
         Properties.get_render_previews().add_job(
             ASSET_TYPE_OBJECT, 
-            path
+            path,
+            priority=PRIORITY_EXPORT
         )
         
         return {'FINISHED'}
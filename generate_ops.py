@@ -23,6 +23,7 @@ from . node_utils           import NodeUtils
 from . properties           import Properties
 from . utils                import blender_2_8x, export_file, ASSET_TYPE_MATERIAL
 from . preferences          import PreferencesPanel
+from . render_queue         import PRIORITY_EXPORT
 
 class GenerateBase(NodeUtils):
     """
@@ -382,7 +383,8 @@ class ExportPBROperator(Operator, GenerateBase):
         # Put onto render queue.
         Properties.get_render_previews().add_job(
             ASSET_TYPE_MATERIAL, 
-            filename
+            filename,
+            priority=PRIORITY_EXPORT
         )
 
         return {'FINISHED'}
@@ -442,7 +444,8 @@ class ExportMaterialOperator(Operator):
         # Put onto render queue.
         Properties.get_render_previews().add_job(
             ASSET_TYPE_MATERIAL, 
-            filename
+            filename,
+            priority=PRIORITY_EXPORT
         )        
 
         return {'FINISHED'} 
@@ -21,6 +21,7 @@ from mathutils              import Vector
 
 from . properties           import Properties
 from . execute_blender      import execute_blender
+from . utils                import ASSET_TYPE_OBJECT, ASSET_TYPE_MATERIAL
 
 class ImportBase:
     """
@@ -112,7 +113,7 @@ class AppendObjectOperator(Operator, ImportBase):
 
         prop = Properties.get()
         self.append_objects(
-            prop.iobj_previews, 
+            prop.selected_entry(ASSET_TYPE_OBJECT), 
             False,
             prop.iobj_at_cursor,
             prop.iobj_lock_xy
@@ -132,7 +133,7 @@ class LinkObjectOperator(Operator, ImportBase):
         
         prop = Properties.get()
         self.append_objects(
-            prop.iobj_previews, 
+            prop.selected_entry(ASSET_TYPE_OBJECT), 
             True,
             prop.iobj_at_cursor,
             prop.iobj_lock_xy
@@ -147,7 +148,7 @@ class SetMaterialOperator(Operator, ImportBase):
     bl_options = {'REGISTER', 'UNDO'}
 
     def execute(self, context):
-        material = self.append_materials(Properties.get().imat_previews)
+        material = self.append_materials(Properties.get().selected_entry(ASSET_TYPE_MATERIAL))
 
         # If we have at least one material imported, apply the first one to
         # all slots of selected objects. If no slot is available, create one.
@@ -168,7 +169,7 @@ class AppendMaterialOperator(Operator, ImportBase):
     bl_options = {'REGISTER', 'UNDO'}
 
     def execute(self, context):
-        self.append_materials(Properties.get().imat_previews)
+        self.append_materials(Properties.get().selected_entry(ASSET_TYPE_MATERIAL))
         return{'FINISHED'}
 
 
@@ -179,7 +180,7 @@ class OpenObjectOperator(Operator):
     bl_options = {'REGISTER'}
 
     def execute(self, context):
-        execute_blender([ Properties.get().iobj_previews, ])
+        execute_blender([ Properties.get().selected_entry(ASSET_TYPE_OBJECT), ])
         return{'FINISHED'}
 
 
@@ -190,5 +191,5 @@ class OpenMaterialOperator(Operator):
     bl_options = {'REGISTER'}
 
     def execute(self, context):
-        execute_blender([ Properties.get().imat_previews, ])
+        execute_blender([ Properties.get().selected_entry(ASSET_TYPE_MATERIAL), ])
         return{'FINISHED'}        
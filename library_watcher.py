@@ -0,0 +1,284 @@
+# Copyright (C) 2019 h0bB1T
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+#
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import bpy, ctypes, ctypes.util, os, platform, queue, struct, threading
+
+from typing                 import Dict, Set, Tuple
+
+from . preferences          import PreferencesPanel
+from . catalog              import FolderRecord
+from . common_utils         import redraw_3d_views
+from . preview_helper       import PreviewHelper
+from . panel_cache          import PanelCache
+from . utils                import CategoriesCache, ASSET_TYPE_OBJECT, ASSET_TYPE_MATERIAL
+
+WATCHED_TYPES = (ASSET_TYPE_OBJECT, ASSET_TYPE_MATERIAL)
+
+# Filesystems on which inotify doesn't see changes made by other machines.
+NETWORK_FILESYSTEMS = ("nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "afs", "fuse.sshfs", "davfs")
+
+# inotify constants (linux/inotify.h).
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = os.O_NONBLOCK if hasattr(os, "O_NONBLOCK") else 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | \
+    IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+
+EVENT = struct.Struct("iIII")
+
+
+def is_network_path(path: str) -> bool:
+    """
+    Check (Linux only) if path is located on a network filesystem.
+    """
+    try:
+        with open("/proc/mounts", "r") as f:
+            mounts = [ l.split() for l in f ]
+    except OSError:
+        return False
+
+    path = os.path.realpath(path)
+    best, fstype = "", ""
+    for m in mounts:
+        if len(m) < 3:
+            continue
+        mp = m[1].replace("\\040", " ")
+        if (path == mp or path.startswith(mp.rstrip("/") + "/")) and len(mp) > len(best):
+            best, fstype = mp, m[2]
+    return fstype in NETWORK_FILESYSTEMS
+
+
+class InotifyWatcher:
+    """
+    Change notification using Linux inotify. One watch per catalog folder.
+    """
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # wd -> (asset_type, rel), (asset_type, rel) -> wd
+        self.watches = {}
+        self.folders = {}
+
+
+    def sync(self, asset_type: str, base: str, folders: Dict[str, FolderRecord]):
+        """
+        Add watches for new catalog folders, remove those of vanished ones.
+        """
+        for key in [ k for k in self.folders if k[0] == asset_type and k[1] not in folders ]:
+            self.libc.inotify_rm_watch(self.fd, self.folders[key])
+            del self.watches[self.folders.pop(key)]
+
+        for rel in folders:
+            if (asset_type, rel) not in self.folders:
+                path = os.fsencode(os.path.join(base, rel))
+                wd = self.libc.inotify_add_watch(self.fd, path, WATCH_MASK)
+                if wd >= 0:
+                    self.watches[wd] = (asset_type, rel)
+                    self.folders[(asset_type, rel)] = wd
+
+
+    def changes(self) -> Set[Tuple[str, str]]:
+        """
+        Return set of (asset_type, rel) folders changed since last call.
+        """
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+
+            pos = 0
+            while pos + EVENT.size <= len(data):
+                wd, mask, _, length = EVENT.unpack_from(data, pos)
+                name = data[pos + EVENT.size:pos + EVENT.size + length].rstrip(b"\0")
+                pos += EVENT.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    # Events lost, everything must be checked.
+                    changed.update((at, "") for at in WATCHED_TYPES)
+                elif wd in self.watches and not name.startswith(b"."):
+                    changed.add(self.watches[wd])
+                if mask & IN_IGNORED and wd in self.watches:
+                    del self.folders[self.watches.pop(wd)]
+        return changed
+
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """
+    Change detection by comparing directory mtimes with the catalog. Stats
+    run on a background thread, so slow (network) filesystems don't block the UI.
+    """
+    def __init__(self, interval: float):
+        self.interval = interval
+        # asset_type -> (base, { rel: mtime }), replaced as a whole on sync.
+        self.snapshots = {}
+        self.queue = queue.Queue()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+
+    def sync(self, asset_type: str, base: str, folders: Dict[str, FolderRecord]):
+        self.snapshots[asset_type] = (base, { rel: r.mtime for rel, r in folders.items() })
+
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            for asset_type, (base, mtimes) in list(self.snapshots.items()):
+                for rel, mtime in mtimes.items():
+                    if self.stop_event.is_set():
+                        return
+                    try:
+                        current = os.stat(os.path.join(base, rel)).st_mtime_ns
+                    except OSError:
+                        current = None
+                    if current != mtime:
+                        self.queue.put((asset_type, rel))
+
+
+    def changes(self) -> Set[Tuple[str, str]]:
+        changed = set()
+        while True:
+            try:
+                changed.add(self.queue.get_nowait())
+            except queue.Empty:
+                return changed
+
+
+    def close(self):
+        self.stop_event.set()
+
+
+class LibraryWatcher:
+    """
+    Driven by a bpy.app.timers callback. Collects change notifications and
+    refreshes only the affected categories and preview collections.
+    """
+    watcher = None
+    root = None
+    mode = None
+    # asset_type -> catalog generation the watched folders are based on.
+    synced = {}
+
+    @staticmethod
+    def create_watcher(root: str, mode: str, interval: float):
+        if mode == 'AUTO' and platform.system() == "Linux" and not is_network_path(root):
+            try:
+                return InotifyWatcher()
+            except (OSError, AttributeError) as ex:
+                print(f"inotify not available, polling library ({ex})")
+        return PollingWatcher(interval)
+
+
+    @staticmethod
+    def sync(asset_type: str):
+        """
+        Update watched folders from catalog (if it has been modified).
+        """
+        catalog = CategoriesCache.catalog(asset_type)
+        if LibraryWatcher.watcher and LibraryWatcher.synced.get(asset_type) != catalog.generation:
+            LibraryWatcher.synced[asset_type] = catalog.generation
+            LibraryWatcher.watcher.sync(asset_type, catalog.base_path(), catalog.folders)
+
+
+    @staticmethod
+    def restart():
+        LibraryWatcher.stop()
+        prefs = PreferencesPanel.get()
+        LibraryWatcher.root = prefs.root
+        LibraryWatcher.mode = prefs.watch_library
+        if prefs.watch_library != 'OFF' and os.path.isdir(prefs.root):
+            LibraryWatcher.watcher = LibraryWatcher.create_watcher(prefs.root, prefs.watch_library, prefs.watch_interval)
+            for asset_type in WATCHED_TYPES:
+                LibraryWatcher.sync(asset_type)
+
+
+    @staticmethod
+    def stop():
+        if LibraryWatcher.watcher:
+            LibraryWatcher.watcher.close()
+            LibraryWatcher.watcher = None
+        LibraryWatcher.synced.clear()
+
+
+    @staticmethod
+    def apply_changes(changed: Set[Tuple[str, str]]):
+        """
+        Refresh changed categories, mark preview collections showing them dirty.
+        """
+        for asset_type in WATCHED_TYPES:
+            rels = sorted(rel for at, rel in changed if at == asset_type)
+            if not rels:
+                continue
+            CategoriesCache.invalidate(asset_type, rels)
+            for rel in rels:
+                PreviewHelper.invalidateData((asset_type, rel))
+        PanelCache.invalidate("export_exists")
+
+        redraw_3d_views()
+
+
+    @staticmethod
+    def tick():
+        """
+        Timer callback, returns time to next call.
+        """
+        prefs = PreferencesPanel.get()
+        if prefs.root != LibraryWatcher.root or prefs.watch_library != LibraryWatcher.mode:
+            LibraryWatcher.restart()
+
+        if LibraryWatcher.watcher:
+            changed = LibraryWatcher.watcher.changes()
+            if changed:
+                LibraryWatcher.apply_changes(changed)
+            for asset_type in WATCHED_TYPES:
+                LibraryWatcher.sync(asset_type)
+
+        return prefs.watch_interval
+
+
+    @staticmethod
+    def start():
+        if not bpy.app.timers.is_registered(LibraryWatcher.tick):
+            bpy.app.timers.register(LibraryWatcher.tick, first_interval=1.0, persistent=True)
+
+
+    @staticmethod
+    def shutdown():
+        if bpy.app.timers.is_registered(LibraryWatcher.tick):
+            bpy.app.timers.unregister(LibraryWatcher.tick)
+        LibraryWatcher.stop()
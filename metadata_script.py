@@ -0,0 +1,59 @@
+# Copyright (C) 2019 h0bB1T
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+#
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+# blender --background --factory-startup --python metadata_script.py -- [assets.json]
+# assets.json: list of asset files (.blend/.fbx) to write metadata sidecars for.
+import bpy, sys, os, json
+
+sys.path.append(os.path.dirname(__file__))
+
+from common_utils           import collect_metadata, write_metadata
+
+def load_objects(asset):
+    """
+    Load all objects of the asset into an empty scene.
+    """
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    if asset.lower().endswith(".fbx"):
+        bpy.ops.import_scene.fbx(filepath=asset)
+        return list(bpy.context.scene.objects)
+
+    with bpy.data.libraries.load(asset, link=False) as (data_from, data_to):
+        data_to.objects = data_from.objects
+    return [ o for o in data_to.objects if o ]
+
+
+def main(args):
+    print("Script args: ", args)
+    with open(args[0], "r", encoding="utf-8") as f:
+        assets = json.load(f)
+
+    for asset in assets:
+        try:
+            write_metadata(asset, collect_metadata(load_objects(asset), asset))
+            print(f"Metadata written: {asset}")
+        except Exception as ex:
+            print(f"Metadata failed: {asset} ({ex})")
+
+    os.remove(args[0])
+
+
+if __name__ == "__main__":
+    if "--" not in sys.argv:
+        argv = []  # as if no args are passed
+    else:
+        argv = sys.argv[sys.argv.index("--") + 1:]  # get all args after "--"
+    main(argv)
@@ -20,6 +20,7 @@ from bpy.types              import Operator
 from bpy.props              import StringProperty
 
 from . node_utils           import NodeUtils
+from . node_manifest        import NodeManifest
 
 class NodeImporter(Operator, NodeUtils):
     bl_idname = "asset_wizard.node_importer_op"
@@ -44,7 +45,11 @@ class NodeImporter(Operator, NodeUtils):
         if bpy.data.node_groups.find(group) > -1:
             return True
 
-        # No, try to import ..
+        # Don't open the library if the group isn't in there at all.
+        if group not in NodeManifest.get(blend).groups:
+            return False # Not available
+
+        # No, try to import (only this group) ..
         with bpy.data.libraries.load(blend, link=link) as (data_src, data_dst):
             if group not in data_src.node_groups:
                 return False # Not available
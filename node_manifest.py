@@ -0,0 +1,117 @@
+# Copyright (C) 2019 h0bB1T
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+#
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import json, os
+
+from typing                 import Tuple
+
+from . catalog              import write_json_atomic
+from . blend_info           import read_blend_names
+
+# Increase if the on-disk layout changes, older manifests are rebuilt then.
+MANIFEST_VERSION = 1
+
+MANIFEST_EXT = ".manifest.json"
+
+
+def stat_key(path: str) -> Tuple[int, int]:
+    """
+    Return (size, mtime_ns), (0, 0) if path doesn't exist.
+    """
+    try:
+        st = os.stat(path)
+        return (st.st_size, st.st_mtime_ns)
+    except OSError:
+        return (0, 0)
+
+
+class NodeManifest:
+    """
+    Index of the node groups of the bundled libraries (data/nodes.blend, ..), so
+    listing and importing groups doesn't need to read the (compressed) library.
+    Stored as <library>.manifest.json and rebuilt if the .blend or its preview
+    folder (<library>/<group>.png) changed.
+    groups = { group name: preview file name (relative to preview folder) or None }
+    """
+    instances = {}
+
+    def __init__(self, blend: str):
+        self.blend = blend
+        self.previews = os.path.splitext(blend)[0]
+        self.key = None
+        self.groups = {}
+
+
+    @staticmethod
+    def get(blend: str):
+        """
+        Return (up to date) manifest of the library.
+        """
+        if blend not in NodeManifest.instances:
+            NodeManifest.instances[blend] = NodeManifest(blend)
+        manifest = NodeManifest.instances[blend]
+        manifest.refresh()
+        return manifest
+
+
+    def manifest_file(self) -> str:
+        return os.path.splitext(self.blend)[0] + MANIFEST_EXT
+
+
+    def current_key(self) -> list:
+        return [ MANIFEST_VERSION, *stat_key(self.blend), *stat_key(self.previews) ]
+
+
+    def refresh(self):
+        key = self.current_key()
+        if key == self.key:
+            return
+
+        try:
+            with open(self.manifest_file(), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data["key"] == key:
+                self.key, self.groups = key, data["groups"]
+                return
+        except (OSError, ValueError, KeyError):
+            pass
+
+        self.build()
+        self.key = key
+        try:
+            write_json_atomic(self.manifest_file(), { "key": key, "groups": self.groups })
+        except OSError as ex:
+            # E.g. add-on installed read only, the manifest is kept for this session.
+            print(f"Can't write manifest: {self.manifest_file()} ({ex})")
+
+
+    def preview(self, group: str) -> str:
+        """
+        Return preview image of the group, None if there's none.
+        """
+        name = self.groups.get(group)
+        return os.path.join(self.previews, name) if name else None
+
+
+    def build(self):
+        try:
+            previews = set(os.listdir(self.previews))
+        except OSError:
+            previews = set()
+        self.groups = {
+            group: group + ".png" if group + ".png" in previews else None
+                for group in read_blend_names(self.blend, "node_groups")
+        }
@@ -0,0 +1,111 @@
+# Copyright (C) 2019 h0bB1T
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+#
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import bpy
+
+from bpy.app.handlers       import persistent
+
+# Values depending on materials/node trees of the selected objects.
+SCENE_VALUES = ("export_textures", )
+
+# Datablock types whose updates may change SCENE_VALUES.
+SCENE_ID_TYPES = ('MATERIAL', 'NODETREE', 'IMAGE', 'MESH')
+
+
+class PanelCache:
+    """
+    View model values of panels, so redraws don't access the file system or walk
+    node trees. A value is stored with the (cheap) inputs it was built from, e.g.
+    category and asset name, and rebuilt if they differ. External state is covered by
+    invalidation: depsgraph updates and msgbus (image paths) for the scene, the
+    library watcher and the operators writing files for the file system.
+    values = { name: (key, value) }
+    """
+    values = {}
+    # Owner of the msgbus subscriptions.
+    owner = object()
+
+    @staticmethod
+    def get(name: str, key: tuple, build):
+        """
+        Return value cached under name, build() it if missing or built for another key.
+        """
+        cached = PanelCache.values.get(name)
+        if not cached or cached[0] != key:
+            cached = (key, build())
+            PanelCache.values[name] = cached
+        return cached[1]
+
+
+    @staticmethod
+    def invalidate(*names: str):
+        """
+        Drop the given values, all if no name is given.
+        """
+        if not names:
+            PanelCache.values.clear()
+        for name in names:
+            PanelCache.values.pop(name, None)
+
+
+    @staticmethod
+    @persistent
+    def depsgraph_updated(scene, depsgraph=None):
+        # Transforms etc. don't change materials, keep the values then.
+        if depsgraph and not any(depsgraph.id_type_updated(t) for t in SCENE_ID_TYPES):
+            return
+        PanelCache.invalidate(*SCENE_VALUES)
+
+
+    @staticmethod
+    def subscribe():
+        """
+        Image path changes don't necessarily update the depsgraph.
+        Subscriptions are dropped on file load, so it's called again then.
+        """
+        bpy.msgbus.clear_by_owner(PanelCache.owner)
+        bpy.msgbus.subscribe_rna(
+            key=(bpy.types.Image, "filepath"),
+            owner=PanelCache.owner,
+            args=SCENE_VALUES,
+            notify=PanelCache.invalidate
+        )
+
+
+    @staticmethod
+    @persistent
+    def file_loaded(_):
+        PanelCache.invalidate()
+        PanelCache.subscribe()
+
+
+    @staticmethod
+    def start():
+        if PanelCache.depsgraph_updated not in bpy.app.handlers.depsgraph_update_post:
+            bpy.app.handlers.depsgraph_update_post.append(PanelCache.depsgraph_updated)
+        if PanelCache.file_loaded not in bpy.app.handlers.load_post:
+            bpy.app.handlers.load_post.append(PanelCache.file_loaded)
+        PanelCache.subscribe()
+
+
+    @staticmethod
+    def shutdown():
+        if PanelCache.depsgraph_updated in bpy.app.handlers.depsgraph_update_post:
+            bpy.app.handlers.depsgraph_update_post.remove(PanelCache.depsgraph_updated)
+        if PanelCache.file_loaded in bpy.app.handlers.load_post:
+            bpy.app.handlers.load_post.remove(PanelCache.file_loaded)
+        bpy.msgbus.clear_by_owner(PanelCache.owner)
+        PanelCache.invalidate()
@@ -19,15 +19,18 @@ import bpy, os
 from bpy.types              import Panel, WindowManager
 from bpy.props              import EnumProperty, StringProperty
 
-from . utils                import textures_of_objects, categories, categories_enum, export_file, export_file_exists, ASSET_TYPE_OBJECT, ASSET_TYPE_MATERIAL
+from . utils                import textures_of_objects, categories, categories_enum, export_file, export_file_exists, page_count, ASSET_TYPE_OBJECT, ASSET_TYPE_MATERIAL
 from . preferences          import PreferencesPanel
 from . preview_helper       import PreviewHelper
+from . panel_cache          import PanelCache
 from . properties           import Properties
 from . create_category_ops  import CreateCategoryOperator
 from . exporter_ops         import UseObjectNameOperator, OverwriteObjectExporterOperator, TexturePackSelectionOperator, ObjectExporterOperator
 from . importer_ops         import (AppendObjectOperator, LinkObjectOperator, 
                                     SetMaterialOperator, AppendMaterialOperator, OpenObjectOperator, OpenMaterialOperator)
-from . render_previews_ops  import RenderPreviewsOperator,RenderAllPreviewsOperator        
+from . render_previews_ops  import (RenderPreviewsOperator, RenderStalePreviewsOperator, RenderAllPreviewsOperator,
+                                        CancelRenderJobOperator, CancelRenderQueueOperator, ResumeRenderQueueOperator,
+                                        DiscardRenderQueueOperator)
 from . generate_ops         import GeneratePBROperator, GenerateImageOperator, ExportPBROperator, ExportMaterialOperator             
 from . node_importer_ops    import NodeImporter  
 from . ao_curv_calc_ops     import BakeAoMapOperator, CurvatureMapOperator, AoNodeOperator, CurvatureNodeOperator, MapGenerateUV, UseObjectNameForMap
@@ -37,7 +40,7 @@ from . tools_ops            import (DX2OGLConverterOperator, GenerateTwoLayerTex
                                         ImportExtMusgrave, ImportExtVoronoi, ImportMixNoise,
                                         ImportScalarMix, ImportIntensityVisualizer, ImportScalarMapper,
                                         ImportNormalDirection, ImportSlice)      
-from . support_ops          import RefreshObjectPreviews, ReRenderObjectPreview, RefreshMaterialPreviews, ReRenderMaterialPreview, RemoveAsset
+from . support_ops          import RefreshObjectPreviews, ReRenderObjectPreview, RefreshMaterialPreviews, ReRenderMaterialPreview, PreviewPage, RemoveAsset
 
 class ImportPanel(Panel):
     """
@@ -54,6 +57,22 @@ class ImportPanel(Panel):
         return context.mode == 'OBJECT'
 
 
+    def draw_pages(self, layout, properties, asset_type):
+        """
+        Page controls, only if the category has more than one page.
+        """
+        lst = properties.preview_list(asset_type)
+        pages = page_count(lst.total)
+        if pages > 1:
+            page = min(lst.data[2], pages - 1)
+            row = layout.row(align=True)
+            op = row.operator(PreviewPage.bl_idname, icon="TRIA_LEFT", text="")
+            op.asset_type, op.step = asset_type, -1
+            row.label(text=f"Page {page + 1} / {pages}")
+            op = row.operator(PreviewPage.bl_idname, icon="TRIA_RIGHT", text="")
+            op.asset_type, op.step = asset_type, 1
+
+
     # Draw
     def draw(self, context):
         prefs = PreferencesPanel.get()
@@ -67,6 +86,19 @@ class ImportPanel(Panel):
         matcats = categories_enum(ASSET_TYPE_MATERIAL)
 
         if objcats or matcats:
+            # Library wide search.
+            col = box.column(align=True)
+            col.prop(properties, "isearch_text", icon="VIEWZOOM")
+            if properties.isearch_text.strip():
+                col.template_icon_view(
+                    properties, 
+                    "isearch_previews", 
+                    show_labels=True,
+                    scale=preview_scale
+                )
+                if not compact:
+                    box = self.layout.box()
+
             # In case of empty asset-object-lib:
             if objcats:
                 if not compact:
@@ -80,12 +112,14 @@ class ImportPanel(Panel):
                     show_labels=True,
                     scale=preview_scale
                 )
+                self.draw_pages(col, properties, ASSET_TYPE_OBJECT)
                 split = col.row(align=True).split(factor=0.5, align=True)
                 split.operator(RefreshObjectPreviews.bl_idname, icon="FILE_REFRESH")
                 split.operator(ReRenderObjectPreview.bl_idname, icon="RENDER_STILL")
 
                 split_outer = col.row(align=True).split(factor=0.9, align=True)
-                is_fbx = properties.iobj_previews.lower().endswith(".fbx")
+                entry = properties.selected_entry(ASSET_TYPE_OBJECT)
+                is_fbx = entry.lower().endswith(".fbx")
                 if is_fbx:
                     split_outer.operator(AppendObjectOperator.bl_idname, icon="ADD")
                 else:
@@ -95,7 +129,7 @@ class ImportPanel(Panel):
                     split.operator(OpenObjectOperator.bl_idname, icon="FILE")
                 op = split_outer.operator(RemoveAsset.bl_idname, icon="PANEL_CLOSE", text="")
                 op.asset_type = ASSET_TYPE_OBJECT
-                op.asset = properties.iobj_previews
+                op.asset = entry
 
                 split = col.row(align=True).split(factor=0.5, align=True)
                 split.prop(properties, "iobj_at_cursor", toggle=True, icon="PIVOT_CURSOR")
@@ -119,6 +153,7 @@ class ImportPanel(Panel):
                     show_labels=True,
                     scale=preview_scale
                     )
+                self.draw_pages(col, properties, ASSET_TYPE_MATERIAL)
                 split = col.row(align=True).split(factor=0.5, align=True)
                 split.operator(RefreshMaterialPreviews.bl_idname, icon="FILE_REFRESH")
                 split.operator(ReRenderMaterialPreview.bl_idname, icon="RENDER_STILL")
@@ -128,7 +163,7 @@ class ImportPanel(Panel):
                 split.operator(OpenMaterialOperator.bl_idname, icon="FILE")
                 #op = split.operator(RemoveAsset.bl_idname, icon="REMOVE")
                 #op.asset_type = ASSET_TYPE_MATERIAL
-                #op.asset = properties.imat_previews
+                #op.asset = properties.selected_entry(ASSET_TYPE_MATERIAL)
 
             else:
                 box.label(text="No material categories yet")
@@ -144,16 +179,38 @@ class ImportPanel(Panel):
             box = self.layout.box()
 
             box.row().label(text="Render Previews")
-        split = box.row(align=True).split(factor=0.5, align=True)
-        split.operator(RenderPreviewsOperator.bl_idname, icon="RENDER_STILL")
-        split.operator(RenderAllPreviewsOperator.bl_idname, icon="RENDER_STILL")    
+        row = box.row(align=True)
+        row.operator(RenderPreviewsOperator.bl_idname, icon="RENDER_STILL")
+        row.operator(RenderStalePreviewsOperator.bl_idname, icon="RENDER_STILL")
+        row.operator(RenderAllPreviewsOperator.bl_idname, icon="RENDER_STILL")    
+
+        # Render queue of an earlier session.
+        render_previews = Properties.get_render_previews()
+        interrupted = render_previews.interrupted_jobs()
+        if interrupted:
+            col = box.column(align=True)
+            col.label(text="Unfinished render queue (%i previews)" % interrupted)
+            row = col.row(align=True)
+            row.operator(ResumeRenderQueueOperator.bl_idname, icon="PLAY")
+            row.operator(DiscardRenderQueueOperator.bl_idname, icon="TRASH")
 
         # Current background render status.
-        status = Properties.get_render_previews().status()
+        status = render_previews.status()
         if status:
             col = box.column(align=True)
-            for line in status.split("::"):
+            lines = status.split("::")
+            row = col.row(align=True)
+            row.label(text=lines[0])
+            row.operator(CancelRenderQueueOperator.bl_idname, text="", icon="CANCEL")
+            for line in lines[1:]:
                 col.row(align=True).label(text=line)
+            # Next jobs, can be removed from the queue.
+            for asset_type, entry in render_previews.queued():
+                row = col.row(align=True)
+                row.label(text="Next: %s" % os.path.basename(entry))
+                op = row.operator(CancelRenderJobOperator.bl_idname, text="", icon="X")
+                op.asset_type = asset_type
+                op.entry = entry
 
 
 class ExportPanel(Panel):
@@ -225,15 +282,20 @@ class ExportPanel(Panel):
             split.operator(UseObjectNameOperator.bl_idname, icon="URL", text="")
 
             # Select operator depending if output file already exists.
-            if export_file_exists(
+            target = (
                 ASSET_TYPE_OBJECT, 
                 properties.eobj_categories, 
                 properties.eobj_asset_name, 
-                Properties.export_type_ext(properties.eobj_export_type)):
+                Properties.export_type_ext(properties.eobj_export_type)
+            )
+            if PanelCache.get("export_exists", target, lambda: export_file_exists(*target)):
                 op = col.row(align=True).operator(OverwriteObjectExporterOperator.bl_idname, icon="EXPORT")
             else:
                 # Only if export to blend and pack textures is enabled .. and if at least one texture can be packed.
-                if properties.eobj_export_type == '0' and properties.eobj_pack_textures and len(textures_of_objects(context.selected_objects)) > 0:
+                if properties.eobj_export_type == '0' and properties.eobj_pack_textures and PanelCache.get(
+                    "export_textures",
+                    tuple(o.name for o in context.selected_objects),
+                    lambda: len(textures_of_objects(context.selected_objects)) > 0):
                     op = col.row(align=True).operator(TexturePackSelectionOperator.bl_idname, icon="EXPORT")
                 else:
                     op = col.row(align=True).operator(ObjectExporterOperator.bl_idname, icon="EXPORT")
@@ -410,6 +472,29 @@ class NodeWizardMapPanel(Panel):
         return os.path.split(bpy.data.filepath)[0]
 
     
+    def get_export_files(self):
+        """
+        Return { postfix: (export file, exists) } of the maps, cached until
+        the export settings change or a map is written.
+        """
+        properties = Properties.get()
+        key = (
+            bpy.data.filepath,
+            properties.cao_export_location,
+            properties.cao_export_subfolder,
+            properties.cao_export_map_basename
+        )
+        return PanelCache.get("map_files", key, self.build_export_files)
+
+
+    def build_export_files(self):
+        files = {}
+        for postfix in ("ao", "curv"):
+            filename = self.get_export_file(postfix)
+            files[postfix] = (filename, os.path.exists(filename))
+        return files
+
+
     def get_export_file(self, postfix):
         """
         Create export file name.
@@ -503,8 +588,9 @@ class NodeWizardMapPanel(Panel):
                 toggle=True,
                 text="Local only" if properties.cao_ao_local else "Global"
             )
+            files = self.get_export_files()
             op = col.operator(BakeAoMapOperator.bl_idname)
-            op.export_path = self.get_export_file("ao")
+            op.export_path = files["ao"][0]
             op.name = properties.cao_export_map_basename
             op.uv_map = properties.cao_uv_map
             op.dimensions = int(properties.cao_ao_size)
@@ -513,9 +599,9 @@ class NodeWizardMapPanel(Panel):
             op.render_margin = properties.cao_ao_margin
             op.local = properties.cao_ao_local
 
-            if os.path.exists(self.get_export_file("ao")):
+            if files["ao"][1]:
                 op = col.operator(AoNodeOperator.bl_idname)
-                op.export_path = self.get_export_file("ao")
+                op.export_path = files["ao"][0]
                 op.name = properties.cao_export_map_basename + "_ao"
                 op.uv_map = properties.cao_uv_map
 
@@ -530,7 +616,7 @@ class NodeWizardMapPanel(Panel):
             col.row(align=True).prop(properties, "cao_curv_line_thickness")
             col.row(align=True).prop(properties, "cao_curv_apply_modifiers", toggle=True)
             op = col.operator(CurvatureMapOperator.bl_idname)
-            op.export_path = self.get_export_file("curv")
+            op.export_path = files["curv"][0]
             op.name = properties.cao_export_map_basename
             op.uv_map = properties.cao_uv_map
             op.dimensions = int(properties.cao_curv_size)
@@ -539,9 +625,9 @@ class NodeWizardMapPanel(Panel):
             op.line_thickness = properties.cao_curv_line_thickness
             op.apply_modifiers = properties.cao_curv_apply_modifiers
 
-            if os.path.exists(self.get_export_file("curv")):
+            if files["curv"][1]:
                 op = col.operator(CurvatureNodeOperator.bl_idname)
-                op.export_path = self.get_export_file("curv")
+                op.export_path = files["curv"][0]
                 op.name = properties.cao_export_map_basename + "_curv"
                 op.uv_map = properties.cao_uv_map
 
@@ -17,7 +17,7 @@
 import bpy, os
 
 from bpy.types              import AddonPreferences
-from bpy.props              import StringProperty, EnumProperty, BoolProperty, FloatProperty
+from bpy.props              import StringProperty, EnumProperty, BoolProperty, FloatProperty, IntProperty
 
 
 class PreferencesPanel(AddonPreferences):
@@ -38,8 +38,16 @@ class PreferencesPanel(AddonPreferences):
 
     preview_engine: EnumProperty(name="Preview render engine", items=preview_engine_type)
 
-    show_blend: BoolProperty(name="Show .blend", default=True)
-    show_fbx: BoolProperty(name="Show .fbx", default=True)
+    render_workers: IntProperty(
+        name="Render processes",
+        description="Previews rendered in parallel, each process gets an equal share of the CPU threads (0: one per 4 cores)",
+        default=0,
+        min=0,
+        max=64
+    )
+
+    show_blend: BoolProperty(name="Show .blend", default=True, update=lambda self, context: self.formats_changed())
+    show_fbx: BoolProperty(name="Show .fbx", default=True, update=lambda self, context: self.formats_changed())
 
     compact_panels: BoolProperty(name="Use compact panels", default=True)
 
@@ -47,11 +55,49 @@ class PreferencesPanel(AddonPreferences):
         name="Scale factor for previews", 
         default=1.0,
         soft_min=0.2,
-        soft_max=5.0
+        soft_max=5.0,
+        update=lambda self, context: self.preview_scale_changed()
         )
 
+    preview_cache_size: IntProperty(
+        name="Preview cache (MB)",
+        description="Memory for previews of recently shown categories, switching back to them needs no reload",
+        default=256,
+        min=0,
+        update=lambda self, context: self.preview_cache_changed()
+    )
+
+    use_thumbnail_packs: BoolProperty(
+        name="Thumbnail packs",
+        description="Store all thumbnails of a category in one file, much faster on network storage",
+        default=False
+    )
+
+    stale_preview_hash: BoolProperty(
+        name="Compare content of stale assets",
+        description="Render stale only re-renders assets whose content changed, not those just touched (reads modified assets)",
+        default=False
+    )
+
     use_category_icons: BoolProperty(name="Use category icons", default=False)
 
+    watch_library: EnumProperty(
+        name="Watch library",
+        items=[
+            ( 'AUTO', "Auto", "Change notifications (inotify) on local Linux filesystems, polling otherwise" ),
+            ( 'POLL', "Poll", "Regularly compare directory modification times" ),
+            ( 'OFF', "Off", "Use Refresh buttons to pick up external changes" ),
+        ],
+        default='AUTO'
+    )
+    watch_interval: FloatProperty(
+        name="Watch interval (s)",
+        description="Seconds between checks for library changes",
+        default=2.0,
+        min=0.5,
+        soft_max=60.0
+    )
+
     export_remap: EnumProperty(
         name="Remap export paths:",
         items=[
@@ -73,13 +119,44 @@ class PreferencesPanel(AddonPreferences):
         c.prop(self, "compact_panels", toggle=True)
         #self.layout.row().prop(self, "use_category_icons", toggle=True)
         c.prop(self, "preview_scale")
-
-        layout.prop(self, "preview_engine")
+        c.prop(self, "preview_cache_size")
+        c.prop(self, "use_thumbnail_packs", toggle=True)
+
+        r = layout.row(align=True)
+        r.prop(self, "preview_engine")
+        r.prop(self, "render_workers")
+        r.prop(self, "stale_preview_hash", toggle=True)
+        r = layout.row(align=True)
+        r.prop(self, "watch_library", expand=True)
+        r.prop(self, "watch_interval")
+        layout.operator("asset_wizard.backfill_metadata_op", icon="FILE_REFRESH")
         from . utils import blender_2_8x
         if not blender_2_8x():
             self.layout.row().prop(self, "export_remap", expand=True)
 
 
+    def formats_changed(self):
+        """
+        Asset numbers of object categories depend on the shown formats.
+        """
+        from . utils import CategoriesCache, ASSET_TYPE_OBJECT
+        if CategoriesCache.cache[ASSET_TYPE_OBJECT]:
+            CategoriesCache.update_cache(ASSET_TYPE_OBJECT)
+
+
+    def preview_scale_changed(self):
+        """
+        Previews are loaded from thumbnails matching the displayed size.
+        """
+        from . preview_helper import PreviewHelper
+        PreviewHelper.invalidateAll()
+
+
+    def preview_cache_changed(self):
+        from . preview_helper import PreviewHelper
+        PreviewHelper.trimCache()
+
+
     @staticmethod
     def get():
         return bpy.context.preferences.addons[__package__].preferences
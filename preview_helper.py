@@ -16,34 +16,73 @@
 
 import bpy, bpy.utils.previews, os
 
+from collections            import OrderedDict
+
+from . preferences          import PreferencesPanel
+from . preview_loader       import PreviewLoader
+from . preview_pool         import PreviewPool
+from . thumbnail_cache      import thumb_size
+
 class CollectionList:
     """
     Stores all information about a single collection. The parser is used
     to parse a new list based on the data. The structure of "data" is parser specific.
+    items is the same list object until the next scan, so enum callbacks can return it as is.
     """
+    __slots__ = ("parser", "data", "mustScan", "collection", "items", "previous", "digests", "total")
+
     def __init__(self, parser, data):
         self.parser = parser
         self.data = data
         self.mustScan = True
         self.collection = None
         self.items = []
+        self.previous = None
+        # PreviewPool images used by the items.
+        self.digests = []
+        # Number of entries of all pages (if the parser pages).
+        self.total = 0
+
+
+    def shows(self, data) -> bool:
+        """
+        Check if the list shows data, which may also be a prefix of the
+        list's data (e.g. (asset_type, category) for all pages).
+        """
+        return self.data == data or (isinstance(self.data, tuple) and self.data[:len(data)] == data)
 
 
     def reset(self):
         """
-        Delete items and collection (if allocated).
+        Delete items and collection (if allocated). Items are replaced by a new
+        list, the previous one is kept, as Blender may still use its strings.
         """
-        self.items.clear()
+        self.previous, self.items = self.items, []
+        PreviewLoader.cancel(self)
+        PreviewPool.release(self.digests)
+        self.digests = []
         if self.collection:
             bpy.utils.previews.remove(self.collection)
+            self.collection = None
+
+
+    def memory(self) -> int:
+        """
+        Estimated size of the preview images in bytes (RGBA, 8 bit).
+        Images shared with other lists are counted for each of them.
+        """
+        return len(set(self.digests)) * thumb_size() ** 2 * 4
 
 
 class PreviewHelper:
     """
     Helper class to manage the lifecycle of different preview items. Able to reparse
-    using a parser.
+    using a parser. Dynamic collections of previously shown data (e.g. other
+    categories) are kept in a LRU cache, limited by the preview cache preference.
     """
     collections = {}
+    # (name, data) -> CollectionList, least recently used first.
+    lru = OrderedDict()
 
     @staticmethod
     def addCollection(name, parser, data):
@@ -76,21 +115,42 @@ class PreviewHelper:
 
 
     @staticmethod
-    def getDynamicCollection(name, parser, data):
-        if name not in PreviewHelper.collections:
-            PreviewHelper.collections[name] = CollectionList(parser, data)
-
-        lst = PreviewHelper.collections[name]
-        if lst.data != data:
-            lst.data = data
-            lst.mustScan = True
+    def getDynamicCollection(name, parser, data, cache=True):
+        """
+        Return collection for data, the one of the previous data is moved
+        to the cache, so switching back doesn't need a rescan. Without cache,
+        only the latest list is kept (e.g. search results, new data per keystroke).
+        """
+        lst = PreviewHelper.collections.get(name)
+        if not lst or lst.data != data:
+            if lst and cache:
+                PreviewHelper.lru[(name, lst.data)] = lst
+            elif lst:
+                lst.reset()
+            lst = (cache and PreviewHelper.lru.pop((name, data), None)) or CollectionList(parser, data)
+            PreviewHelper.collections[name] = lst
 
         if lst.mustScan:
             PreviewHelper.scanCollection(lst)
-            
+            PreviewHelper.trimCache()
+
         return lst
 
 
+    @staticmethod
+    def trimCache():
+        """
+        Drop least recently used cached collections until all previews fit into the budget.
+        """
+        budget = PreferencesPanel.get().preview_cache_size * 1024 * 1024
+        used = sum(lst.memory() for lst in PreviewHelper.collections.values()) + \
+            sum(lst.memory() for lst in PreviewHelper.lru.values())
+        while PreviewHelper.lru and used > budget:
+            _, lst = PreviewHelper.lru.popitem(last=False)
+            used -= lst.memory()
+            lst.reset()
+
+
     @staticmethod
     def setData(name, data, forceUpdate=False):
         """
@@ -102,6 +162,35 @@ class PreviewHelper:
             lst.mustScan = True
 
 
+    @staticmethod
+    def invalidateData(data):
+        """
+        Force update for all collections showing the given data.
+        """
+        for lst in PreviewHelper.collections.values():
+            if lst.shows(data):
+                lst.mustScan = True
+        for key in [ k for k, lst in PreviewHelper.lru.items() if lst.shows(data) ]:
+            PreviewHelper.lru.pop(key).reset()
+
+
+    @staticmethod
+    def invalidateAll():
+        """
+        Force update for all collections (e.g. other thumbnail size).
+        """
+        for lst in PreviewHelper.collections.values():
+            lst.mustScan = True
+        PreviewHelper.clearCache()
+
+
+    @staticmethod
+    def clearCache():
+        for lst in PreviewHelper.lru.values():
+            lst.reset()
+        PreviewHelper.lru.clear()
+
+
     @staticmethod
     def forceUpdate(name):
         """
@@ -118,3 +207,5 @@ class PreviewHelper:
         for lst in PreviewHelper.collections.values():
             lst.reset()
         PreviewHelper.collections.clear()
+        PreviewHelper.clearCache()
+        PreviewPool.clear()
@@ -0,0 +1,209 @@
+# Copyright (C) 2019 h0bB1T
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+#
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import bpy, os, queue, threading, time
+
+from . preferences          import PreferencesPanel
+from . thumbnail_cache      import ThumbnailCache, decode_png, png_size
+from . preview_pool         import PreviewPool, image_digest
+from . common_utils         import redraw_3d_views
+
+# Seconds between timer calls while previews are loaded.
+TIMER_INTERVAL = 0.05
+
+# Max. seconds per timer call spent on decoding images into previews.
+APPLY_BUDGET = 0.02
+
+# Max. pixels decoded per timer call (one largest thumbnail), checked before
+# decoding, so a single large image can't block the UI beyond the time budget.
+PIXEL_BUDGET = 512 * 512
+
+
+class PreviewLoader:
+    """
+    Loads previews (thumbnails) in the background. A worker thread does the file
+    I/O and creates missing thumbnails (imbuf), a bpy.app.timers callback lets
+    Blender decode a few thumbnail sized images per call, puts them into the
+    PreviewPool and updates the items. Parsers fill the lists with the placeholder icon, so the UI isn't blocked
+    until a whole category is loaded. Requests are handled in order, so the first
+    items of a list show up first.
+    """
+    requests = queue.Queue()
+    results = queue.Queue()
+    thread = None
+    # id() of CollectionLists whose requests are still wanted.
+    active = set()
+    # Requests without result processed by the timer yet.
+    pending = 0
+    # Result taken from the queue, but left for the next timer call (pixel budget).
+    held = None
+
+    @staticmethod
+    def request(lst, index: int, source: str, size: int, pack=None):
+        """
+        Load thumbnail of source (preview image) as icon of lst.items[index].
+        Without lst, only a missing thumbnail is created. If a pack (PackReader)
+        is given, the thumbnail is read from it.
+        """
+        items = None
+        if lst is not None:
+            PreviewLoader.active.add(id(lst))
+            items = lst.items
+        PreviewLoader.pending += 1
+        PreviewLoader.requests.put((lst, items, index, PreferencesPanel.get().root, source, size, pack))
+
+        if not PreviewLoader.thread or not PreviewLoader.thread.is_alive():
+            PreviewLoader.thread = threading.Thread(
+                target=PreviewLoader.run,
+                args=(PreviewLoader.requests, PreviewLoader.results),
+                daemon=True
+            )
+            PreviewLoader.thread.start()
+        if not bpy.app.timers.is_registered(PreviewLoader.tick):
+            bpy.app.timers.register(PreviewLoader.tick, first_interval=TIMER_INTERVAL)
+
+
+    @staticmethod
+    def prefetch(sources, size: int):
+        """
+        Create missing thumbnails of the given previews (e.g. next page).
+        """
+        for source in sources:
+            PreviewLoader.request(None, None, source, size)
+
+
+    @staticmethod
+    def cancel(lst):
+        """
+        Drop outstanding requests of the list (e.g. it's removed).
+        """
+        PreviewLoader.active.discard(id(lst))
+
+
+    @staticmethod
+    def run(requests: queue.Queue, results: queue.Queue):
+        """
+        Worker thread, no bpy access in here. Results are the PNG data read
+        from the pack or (file to load, thumbnail to create) of ThumbnailCache.prepare,
+        along with the number of pixels to decode.
+        """
+        while True:
+            job = requests.get()
+            if job is None:
+                return
+            lst, items, index, root, source, size, pack = job
+            if lst is not None and id(lst) not in PreviewLoader.active:
+                results.put(None)
+                continue
+            result, pixels = None, size * size
+            if pack:
+                try:
+                    name = os.path.basename(source)
+                    result = pack.png(name)
+                    pixels = pack.index[name][3] * pack.index[name][4]
+                except (ValueError, KeyError): # Pack closed (replaced) meanwhile.
+                    pass
+            if result is None:
+                result = ThumbnailCache.prepare(root, source, size)
+                if lst is None and result and not result[1]:
+                    result = None # Thumbnail exists, nothing to prefetch.
+                elif result:
+                    try:
+                        dim = png_size(result[0])
+                        pixels = dim[0] * dim[1] if dim else pixels
+                    except OSError:
+                        pass
+            results.put((lst, items, index, source, size, result, pixels) if result else None)
+
+
+    @staticmethod
+    def apply(job) -> bool:
+        """
+        Decode image and set its icon in the item, returns True if an item changed.
+        """
+        lst, items, index, source, size, result, _ = job
+        if lst is None:
+            ThumbnailCache.load(result[0], result[1], size)
+            return False
+        # Rescanned lists have a new items list.
+        if id(lst) not in PreviewLoader.active or lst.items is not items:
+            return False
+
+        if isinstance(result, bytes):
+            try:
+                image = decode_png(os.path.basename(source), result)
+            except RuntimeError as ex:
+                print(f"Can't decode packed preview {source} ({ex})")
+                PreviewLoader.request(lst, index, source, size)
+                return False
+        else:
+            image = ThumbnailCache.load(result[0], result[1], size)
+        if not image:
+            return False
+
+        width, height, pixels = image
+        digest = image_digest(width, height, pixels)
+        icon_id = PreviewPool.acquire(digest, width, height, pixels)
+        lst.digests.append(digest)
+        key, label, description, _, number = items[index]
+        items[index] = (key, label, description, icon_id, number)
+        return True
+
+
+    @staticmethod
+    def tick():
+        """
+        Timer callback, returns time to next call (None: stop until new requests).
+        """
+        start = time.perf_counter()
+        changed, decoded = False, 0
+        while time.perf_counter() - start < APPLY_BUDGET:
+            job, PreviewLoader.held = PreviewLoader.held, None
+            if not job:
+                try:
+                    job = PreviewLoader.results.get_nowait()
+                except queue.Empty:
+                    break
+                if not job:
+                    PreviewLoader.pending -= 1
+                    continue
+            # At least one image per call, large ones (no imbuf) on their own.
+            if decoded and decoded + job[-1] > PIXEL_BUDGET:
+                PreviewLoader.held = job
+                break
+            PreviewLoader.pending -= 1
+            decoded += job[-1]
+            if PreviewLoader.apply(job):
+                changed = True
+
+        if changed:
+            redraw_3d_views()
+        return TIMER_INTERVAL if PreviewLoader.pending > 0 else None
+
+
+    @staticmethod
+    def shutdown():
+        if bpy.app.timers.is_registered(PreviewLoader.tick):
+            bpy.app.timers.unregister(PreviewLoader.tick)
+        PreviewLoader.active.clear()
+        if PreviewLoader.thread:
+            PreviewLoader.requests.put(None)
+            PreviewLoader.thread = None
+        # Results of the stopped worker are never read.
+        PreviewLoader.requests = queue.Queue()
+        PreviewLoader.results = queue.Queue()
+        PreviewLoader.pending = 0
+        PreviewLoader.held = None
@@ -14,16 +14,45 @@
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
 
-import bpy, os
+import os
 
 from . preferences          import PreferencesPanel
-from . utils                import parse_entry_list, split_entry, ASSET_TYPE_OBJECT
+from . utils                import parse_entry_list, split_entry, page_count, category_previews, ASSET_TYPE_OBJECT, PAGE_SIZE
+from . node_manifest        import NodeManifest
+from . search_index         import LibrarySearch
+from . asset_table          import AssetTable
+from . thumbnail_cache      import thumb_size
+from . preview_loader       import PreviewLoader
+from . preview_pool         import PreviewPool
+from . thumbnail_pack       import ThumbnailPack
+
+# Identifier of the item shown if a search has no match, never imported.
+NO_MATCH = "NONE"
+
+def update_pack(asset_type, category, previews=None):
+    """
+    Rebuild thumbnail pack of the category in the background.
+    previews = preview file names, default all of the category.
+    """
+    root = PreferencesPanel.get().root
+    ThumbnailPack.update_async(
+        root,
+        asset_type,
+        category,
+        os.path.join(root, asset_type, category),
+        list(previews if previews is not None else category_previews(asset_type, category)),
+        thumb_size()
+    )
+
 
 class CollectionImageParser:
     """
     Parser for PreviewHelper. Parses all supported objects and creates
-    the collection using the preview images.
-    data = [asset_type, category]
+    the items using the preview images (PreviewPool). Items are identified by
+    AssetTable keys, not by the (long) entry paths. The AssetTable ID is the
+    enum number too, Blender stores it as selection, so it survives rescans. Only a single page of the
+    category is loaded, thumbnails of the adjacent pages are prefetched.
+    data = [asset_type, category, page]
     """
  
     def parse(self, lst):
@@ -31,29 +60,69 @@ class CollectionImageParser:
         Parses the directory for supported files and create list from 
         preview images.
         """
-        asset_type, category = lst.data
+        asset_type, category, page = lst.data
         fp = os.path.join(PreferencesPanel.get().root, asset_type, category)
         print("Parse collection: ", fp)
 
-        id = 0
-        noIcon = os.path.join(os.path.dirname(__file__), "data", "No_Icon.png")
-        for entry in parse_entry_list(asset_type, category):
-            if not lst.collection: # lazy init
-                lst.collection = bpy.utils.previews.new()
+        entries = parse_entry_list(asset_type, category)
+        lst.total = len(entries)
+        page = min(page, page_count(len(entries)) - 1)
+        start = page * PAGE_SIZE
 
+        size = thumb_size()
+        placeholder = PreviewPool.placeholder()
+
+        # Thumbnails of unchanged previews are read from the category pack.
+        use_packs, pack, outdated = PreferencesPanel.get().use_thumbnail_packs, None, False
+        previews = category_previews(asset_type, category)
+        if use_packs:
+            pack = ThumbnailPack.get(PreferencesPanel.get().root, asset_type, category, size)
+
+        for id, entry in enumerate(entries[start:start + PAGE_SIZE]):
+            # Placeholder until the preview is decoded, it stays if there's no preview.
             imp, preview, label, mat = split_entry(entry)
-            if os.path.exists(preview):
-                thumb = lst.collection.load(entry, preview, 'IMAGE')
-            else:
-                thumb = lst.collection.load(entry, noIcon, 'IMAGE')
-            lst.items.append((entry, label, label, thumb.icon_id, id))
-            id += 1
+            aid = AssetTable.id_of(entry)
+            lst.items.append((str(aid), label, label, placeholder, aid))
+            name = os.path.basename(preview)
+            if name in previews:
+                packed = pack and pack.find(name, previews[name])
+                outdated = outdated or (use_packs and not packed)
+                PreviewLoader.request(lst, id, preview, size, pack=pack if packed else None)
+
+        if outdated:
+            update_pack(asset_type, category, previews)
+
+        adjacent = entries[start + PAGE_SIZE:start + 2 * PAGE_SIZE] + entries[max(0, start - PAGE_SIZE):start]
+        PreviewLoader.prefetch([ split_entry(e)[1] for e in adjacent ], size)
+
+
+class SearchResultParser:
+    """
+    Parser for PreviewHelper. Searches the whole library, previews are
+    loaded for the matches only.
+    data = (query, )
+    """
+
+    def parse(self, lst):
+        """
+        Search and create list from preview images of the matches.
+        """
+        size = thumb_size()
+        placeholder = PreviewPool.placeholder()
+        for id, (entry, label, asset_type, category) in enumerate(LibrarySearch.search(lst.data[0])):
+            aid = AssetTable.id_of(entry)
+            lst.items.append((str(aid), label, f"{asset_type}: {category}", placeholder, aid))
+            PreviewLoader.request(lst, id, split_entry(entry)[1], size)
+
+        if not lst.items:
+            lst.items.append((NO_MATCH, "No match", "", 0, 0))
 
 
 class NodesParser:
     """
-    Parses nodes from specific blend file, load previews from respective
-    data folder.
+    Parses nodes from specific blend file (listed in its manifest), load
+    previews from respective data folder. Previews go through the PreviewPool
+    like asset previews, so identical images are decoded once.
     data = blend basename/folder name.
     """
 
@@ -63,20 +132,14 @@ class NodesParser:
         """
         id = 0
         data = os.path.join(os.path.dirname(__file__), "data")
-        noIcon = os.path.join(data, "No_Icon.png")
         blend = os.path.join(data, lst.data + ".blend")
-        previews = os.path.join(data, lst.data)
-        with bpy.data.libraries.load(blend, link=False) as (data_src, data_dst):
-            for group in data_src.node_groups:
-                if group.startswith("NW_"):
-                    preview = os.path.join(previews, group + ".png")
-                    if not lst.collection: # lazy init
-                        lst.collection = bpy.utils.previews.new()
-                    if os.path.exists(preview):
-                        thumb = lst.collection.load(group, preview, 'IMAGE')
-                    else:
-                        thumb = lst.collection.load(group, noIcon, 'IMAGE')
-                    lst.items.append(("%s::%s" % (blend, group), group, "", thumb.icon_id, id))
-                    id += 1
-
-
+        manifest = NodeManifest.get(blend)
+        size = thumb_size()
+        placeholder = PreviewPool.placeholder()
+        for group in manifest.groups:
+            if group.startswith("NW_"):
+                lst.items.append(("%s::%s" % (blend, group), group, "", placeholder, id))
+                preview = manifest.preview(group)
+                if preview:
+                    PreviewLoader.request(lst, id, preview, size)
+                id += 1
@@ -0,0 +1,101 @@
+# Copyright (C) 2019 h0bB1T
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+#
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import bpy, bpy.utils.previews, hashlib, os
+
+from array                  import array
+from typing                 import List
+
+PLACEHOLDER = os.path.join(os.path.dirname(__file__), "data", "No_Icon.png")
+
+
+def image_digest(width: int, height: int, pixels: array) -> str:
+    """
+    Content key of a decoded image (float pixels as copied from Blender).
+    """
+    sha = hashlib.sha1(f"{width}x{height}:".encode("ascii"))
+    sha.update(pixels)
+    return sha.hexdigest()
+
+
+class PreviewPool:
+    """
+    Session wide previews keyed by image content, so identical images (e.g. variants
+    rendered from the same material) are stored once and share their icon. The
+    placeholder for missing previews is loaded once and never released.
+    refs = { digest: number of collection items using the preview }
+    """
+    collection = None
+    refs = {}
+
+    @staticmethod
+    def previews():
+        if not PreviewPool.collection:
+            PreviewPool.collection = bpy.utils.previews.new()
+        return PreviewPool.collection
+
+
+    @staticmethod
+    def placeholder() -> int:
+        """
+        Return icon id of the placeholder (No_Icon.png).
+        """
+        previews = PreviewPool.previews()
+        if "placeholder" not in previews:
+            previews.load("placeholder", PLACEHOLDER, 'IMAGE')
+        return previews["placeholder"].icon_id
+
+
+    @staticmethod
+    def acquire(digest: str, width: int, height: int, pixels: array) -> int:
+        """
+        Return icon id of the image, it's created from pixels if unknown.
+        """
+        previews = PreviewPool.previews()
+        if digest in PreviewPool.refs:
+            PreviewPool.refs[digest] += 1
+            return previews[digest].icon_id
+
+        preview = previews.new(digest)
+        preview.image_size = (width, height)
+        try:
+            preview.image_pixels_float.foreach_set(pixels)
+        except AttributeError: # Blender < 2.83
+            preview.image_pixels_float = pixels
+        PreviewPool.refs[digest] = 1
+        return preview.icon_id
+
+
+    @staticmethod
+    def release(digests: List[str]):
+        """
+        Drop one reference per digest, unused previews are freed.
+        """
+        for digest in digests:
+            refs = PreviewPool.refs.get(digest, 0) - 1
+            if refs > 0:
+                PreviewPool.refs[digest] = refs
+            elif digest in PreviewPool.refs:
+                del PreviewPool.refs[digest]
+                del PreviewPool.collection[digest]
+
+
+    @staticmethod
+    def clear():
+        if PreviewPool.collection:
+            bpy.utils.previews.remove(PreviewPool.collection)
+            PreviewPool.collection = None
+        PreviewPool.refs.clear()
@@ -0,0 +1,217 @@
+# Copyright (C) 2019 h0bB1T
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+#
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import hashlib, json, os, time
+
+from concurrent.futures     import ThreadPoolExecutor
+from . catalog              import cache_folder, write_json_atomic
+
+# Increase if the on-disk layout changes, older caches are dropped then.
+PREVIEW_HASHES_VERSION = 1
+
+# Bytes read at once while hashing assets.
+HASH_CHUNK = 1 << 20
+
+# Min. seconds between writes of the hashes while previews are rendered.
+SAVE_INTERVAL = 30.0
+
+
+def file_hash(filename: str) -> str:
+    sha = hashlib.sha1()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def asset_state(asset: str) -> list:
+    """
+    Return [mtime_ns, sha1] of the asset, as recorded in PreviewHashes.
+    """
+    mtime = os.stat(asset).st_mtime_ns
+    return [ mtime, file_hash(asset) ]
+
+
+def preview_stale(asset: str, preview: str) -> bool:
+    """
+    Check if the preview is missing or older than its asset (.blend/.fbx).
+    """
+    try:
+        rendered = os.stat(preview).st_mtime_ns
+    except OSError:
+        return True
+    try:
+        return os.stat(asset).st_mtime_ns > rendered
+    except OSError:
+        return False
+
+
+class PreviewHashes:
+    """
+    Persistent record of the asset content each preview was rendered from, so assets
+    that were only touched (newer mtime, same content) aren't rendered again.
+    previews = { preview path: [asset mtime_ns, sha1 of asset] }
+    Assets are hashed on a worker thread when their render starts, so the hash
+    matches the content the preview is rendered from.
+    """
+    instances = {}
+    # Shared by all roots, hashing is bound by disk reads.
+    executor = None
+
+    def __init__(self, root: str):
+        self.root = root
+        self.previews = {}
+        self.loaded = False
+        self.dirty = False
+        # { asset: Future of asset_state } of renders in progress.
+        self.hashing = {}
+        # { preview key: Future of asset_state } of rendered previews, until saved.
+        self.rendered = {}
+        self.saved = 0.0
+
+
+    @staticmethod
+    def get(root: str):
+        """
+        Return (shared) hashes for the given asset root.
+        """
+        if root not in PreviewHashes.instances:
+            PreviewHashes.instances[root] = PreviewHashes(root)
+        return PreviewHashes.instances[root]
+
+
+    def cache_file(self) -> str:
+        return os.path.join(cache_folder(self.root), "preview_hashes.json")
+
+
+    def load(self):
+        self.loaded = True
+        try:
+            with open(self.cache_file(), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == PREVIEW_HASHES_VERSION:
+                self.previews = data["previews"]
+        except (OSError, ValueError, KeyError):
+            self.previews = {}
+
+
+    def save(self, interval: float = 0.0):
+        """
+        Write hashes if modified since last save, but not within interval
+        seconds after the last write. Hashes still computed are left for later.
+        """
+        self.collect()
+        if not self.dirty or time.monotonic() - self.saved < interval:
+            return
+        self.dirty = False
+        self.saved = time.monotonic()
+        try:
+            write_json_atomic(self.cache_file(), {
+                "version": PREVIEW_HASHES_VERSION,
+                "previews": self.previews
+            })
+        except OSError as ex:
+            print(f"Can't write preview hashes: {self.cache_file()} ({ex})")
+
+
+    def key(self, preview: str) -> str:
+        try:
+            rel = os.path.relpath(preview, self.root)
+        except ValueError: # Different drive (Windows).
+            return preview
+        return preview if rel.startswith("..") else rel.replace(os.sep, "/")
+
+
+    def hash_async(self, asset: str):
+        """
+        Start hashing the asset in the background (e.g. its render is started).
+        """
+        if asset not in self.hashing:
+            if not PreviewHashes.executor:
+                PreviewHashes.executor = ThreadPoolExecutor(max_workers=1)
+            self.hashing[asset] = PreviewHashes.executor.submit(asset_state, asset)
+
+
+    def record(self, asset: str, preview: str):
+        """
+        Remember the asset content the preview has just been rendered from, that
+        is the hash started by hash_async. It's stored on the next save.
+        """
+        if asset not in self.hashing:
+            self.hash_async(asset)
+        self.rendered[self.key(preview)] = self.hashing.pop(asset)
+
+
+    def forget(self, asset: str):
+        """
+        Drop hash of a render that didn't produce a preview.
+        """
+        self.hashing.pop(asset, None)
+
+
+    def collect(self):
+        """
+        Take over finished hashes of rendered previews.
+        """
+        if not self.loaded:
+            self.load()
+        for key, future in list(self.rendered.items()):
+            if not future.done():
+                continue
+            del self.rendered[key]
+            try:
+                self.previews[key] = future.result()
+                self.dirty = True
+            except OSError as ex:
+                print(f"Can't hash asset of preview: {key} ({ex})")
+
+
+    def flush(self):
+        """
+        Wait for the hashes of rendered previews and write them.
+        """
+        for future in list(self.rendered.values()):
+            try:
+                future.result()
+            except OSError:
+                pass
+        self.save()
+
+
+    def changed(self, asset: str, preview: str) -> bool:
+        """
+        Check if the asset content differs from the one the preview was rendered
+        from. Unknown previews count as changed. The asset is only read if its
+        mtime differs from the recorded one.
+        """
+        if not self.loaded:
+            self.load()
+        entry = self.previews.get(self.key(preview))
+        if not entry:
+            return True
+        try:
+            mtime = os.stat(asset).st_mtime_ns
+            if mtime == entry[0]:
+                return False
+            if file_hash(asset) != entry[1]:
+                return True
+        except OSError:
+            return True
+
+        # Only touched, no need to hash again next time.
+        entry[0] = mtime
+        self.dirty = True
+        return False
@@ -18,11 +18,13 @@ import bpy, os
 from bpy.props import EnumProperty, BoolProperty, IntProperty, PointerProperty, StringProperty, FloatProperty, CollectionProperty
 from bpy.types import PropertyGroup, WindowManager
 
-from . utils                import (categories, categories_enum, 
+from . utils                import (categories, categories_enum, entry_page,
                                         ASSET_TYPE_OBJECT, ASSET_TYPE_MATERIAL,
                                         ASSET_TYPE_NODES, ASSET_TYPE_NODES_MATERIALS)
 from . preview_helper       import PreviewHelper
-from . preview_parsers      import CollectionImageParser
+from . preview_parsers      import CollectionImageParser, SearchResultParser, NO_MATCH
+from . search_index         import LibrarySearch
+from . asset_table          import AssetTable
 
 class TexturesToExport(PropertyGroup):
     selected: BoolProperty()
@@ -132,12 +134,9 @@ class Properties(PropertyGroup):
         update=lambda self, __: self.reset_enum_selection(ASSET_TYPE_OBJECT)
     )
     iobj_previews: EnumProperty(
-        items=lambda self, __: PreviewHelper.getDynamicCollection(
-            ASSET_TYPE_OBJECT, 
-            CollectionImageParser(),
-            (ASSET_TYPE_OBJECT, self.iobj_categories)
-        ).items
+        items=lambda self, __: self.preview_list(ASSET_TYPE_OBJECT).items
     )
+    iobj_page: IntProperty(min=0, default=0)
     iobj_at_cursor: BoolProperty(name="At Cursor", description="Move imported objects to cursor position", default=False)
     iobj_lock_xy: BoolProperty(name="Lock XY", description="Lock in XY plane (move & rotation)")
     imat_categories: EnumProperty(
@@ -147,11 +146,24 @@ class Properties(PropertyGroup):
         update=lambda self, __: self.reset_enum_selection(ASSET_TYPE_MATERIAL)
     )
     imat_previews: EnumProperty(
+        items=lambda self, __: self.preview_list(ASSET_TYPE_MATERIAL).items
+    )
+    imat_page: IntProperty(min=0, default=0)
+
+
+    isearch_text: StringProperty(
+        name="", 
+        description="Search objects and materials in all categories",
+        options={'TEXTEDIT_UPDATE'}
+    )
+    isearch_previews: EnumProperty(
         items=lambda self, __: PreviewHelper.getDynamicCollection(
-            ASSET_TYPE_MATERIAL, 
-            CollectionImageParser(),
-            (ASSET_TYPE_MATERIAL, self.imat_categories)
-        ).items
+            "search",
+            SearchResultParser(),
+            (self.isearch_text, ),
+            cache=False
+        ).items,
+        update=lambda self, __: self.select_search_result()
     )
 
 
@@ -219,26 +231,78 @@ class Properties(PropertyGroup):
         return layers
 
 
+    def preview_list(self, asset_type: str):
+        """
+        Return (parsed) preview list of the current category and page.
+        """
+        if asset_type == ASSET_TYPE_OBJECT:
+            data = (ASSET_TYPE_OBJECT, self.iobj_categories, self.iobj_page)
+        else:
+            data = (ASSET_TYPE_MATERIAL, self.imat_categories, self.imat_page)
+        return PreviewHelper.getDynamicCollection(asset_type, CollectionImageParser(), data)
+
+
+    def shown_category(self, asset_type: str) -> str:
+        """
+        Return category currently shown in the importer, None for other asset types.
+        """
+        if asset_type == ASSET_TYPE_OBJECT:
+            return self.iobj_categories
+        elif asset_type == ASSET_TYPE_MATERIAL:
+            return self.imat_categories
+        return None
+
+
+    def selected_entry(self, asset_type: str) -> str:
+        """
+        Return entry (path/abc.blend or path/abc.blend::Material) of the selected preview.
+        """
+        if asset_type == ASSET_TYPE_OBJECT:
+            return AssetTable.entry_of_key(self.iobj_previews)
+        elif asset_type == ASSET_TYPE_MATERIAL:
+            return AssetTable.entry_of_key(self.imat_previews)
+        return ""
+
+
+    def select_page(self, asset_type: str, page: int, key: str = None):
+        """
+        Show page of current category, select entry (by AssetTable key) or the first one of the page.
+        """
+        if asset_type == ASSET_TYPE_OBJECT:
+            self.iobj_page = page
+            self.iobj_previews = key or self.preview_list(asset_type).items[0][0]
+        elif asset_type == ASSET_TYPE_MATERIAL:
+            self.imat_page = page
+            self.imat_previews = key or self.preview_list(asset_type).items[0][0]
+
+
     def reset_enum_selection(self, asset_type: str):
+        self.select_page(asset_type, 0)
+
+
+    def select_search_result(self):
+        """
+        Switch category and selection to the chosen search match.
+        """
+        if self.isearch_previews == NO_MATCH or self.isearch_previews not in LibrarySearch.hits:
+            return
+        key = self.isearch_previews
+        asset_type, category = LibrarySearch.hits[key]
         if asset_type == ASSET_TYPE_OBJECT:
-            self.iobj_previews = PreviewHelper.getDynamicCollection(
-                ASSET_TYPE_OBJECT, 
-                CollectionImageParser(),
-                (ASSET_TYPE_OBJECT, self.iobj_categories)
-            ).items[0][0]
+            self.iobj_categories = category
         elif asset_type == ASSET_TYPE_MATERIAL:
-            self.imat_previews = PreviewHelper.getDynamicCollection(
-                ASSET_TYPE_MATERIAL, 
-                CollectionImageParser(),
-                (ASSET_TYPE_MATERIAL, self.imat_categories)
-            ).items[0][0]
+            self.imat_categories = category
+        entry = AssetTable.entry_of_key(key)
+        self.select_page(asset_type, entry_page(asset_type, category, entry), key)
 
 
     @staticmethod
     def initialize():
-        from . render_previews_ops  import RenderPreviews
+        from . render_previews_ops  import RenderPreviews, check_journal
         WindowManager.asset_wizard_properties = PointerProperty(type=Properties)
         WindowManager.asset_wizard_render_previews = RenderPreviews()
+        if not bpy.app.timers.is_registered(check_journal):
+            bpy.app.timers.register(check_journal, first_interval=1.0, persistent=True)
 
 
     @staticmethod
@@ -253,6 +317,10 @@ class Properties(PropertyGroup):
 
     @staticmethod
     def cleanup():
+        from . render_previews_ops  import check_journal
+        if bpy.app.timers.is_registered(check_journal):
+            bpy.app.timers.unregister(check_journal)
+        WindowManager.asset_wizard_render_previews.shutdown()
         del(WindowManager.asset_wizard_render_previews)
         del(WindowManager.asset_wizard_properties)
 
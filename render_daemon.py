@@ -0,0 +1,134 @@
+# Copyright (C) 2019 h0bB1T
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+#
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import json, queue, threading, time
+
+from typing                 import List, Tuple
+
+from . execute_blender      import run_render_daemon
+
+# Prefix of replies on the daemon's stdout (see render_script.py).
+REPLY_PREFIX = "@asset_wizard "
+
+
+class RenderDaemon:
+    """
+    Background Blender process (render_script.py --daemon), which keeps preview.blend
+    loaded and renders the jobs sent as JSON lines to its stdin. Replies are
+    collected by a reader thread, so results() never blocks the UI.
+    pending = { job id: job }, in order of submission.
+    """
+    def __init__(self, threads: int):
+        self.process = run_render_daemon(threads)
+        self.pending = {}
+        self.replies = queue.Queue()
+        self.alive = True
+        # Jobs sent, but not started before the process exited.
+        self.dropped = []
+        self.idle_since = time.monotonic()
+        self.reader = threading.Thread(
+            target=RenderDaemon.read,
+            args=(self.process.stdout, self.replies),
+            daemon=True
+        )
+        self.reader.start()
+
+
+    @staticmethod
+    def read(stdout, replies):
+        """
+        Reader thread, a None reply marks the end of the process.
+        """
+        for line in stdout:
+            pos = line.find(REPLY_PREFIX)
+            if pos < 0:
+                # Blender's own output, shown as without the pipe.
+                print(line, end="")
+                continue
+            try:
+                replies.put(json.loads(line[pos + len(REPLY_PREFIX):]))
+            except ValueError:
+                print(line, end="")
+        stdout.close()
+        replies.put(None)
+
+
+    def submit(self, job_id: int, job, asset: str, preview: str, asset_type: str, engine: str) -> bool:
+        """
+        Send a job to the daemon, returns False if the process has gone.
+        """
+        message = { "id": job_id, "asset": asset, "preview": preview, "asset_type": asset_type, "engine": engine }
+        try:
+            self.process.stdin.write(json.dumps(message) + "\n")
+            self.process.stdin.flush()
+        except (OSError, ValueError):
+            return False
+        self.pending[job_id] = job
+        return True
+
+
+    def results(self) -> List[Tuple[object, dict]]:
+        """
+        Return [ (job, reply) ] of the jobs completed since the last call. If the
+        process has exited, the job it was rendering is returned with an error
+        reply, the following ones are moved to dropped.
+        """
+        done = []
+        while True:
+            try:
+                reply = self.replies.get_nowait()
+            except queue.Empty:
+                break
+            if reply is None:
+                self.alive = False
+                code = self.process.wait()
+                if self.pending:
+                    job_id, job = next(iter(self.pending.items()))
+                    done.append((job, { "id": job_id, "ok": False, "time": 0.0, "error": f"render process exited ({code})" }))
+                    self.dropped = self.waiting()
+                    self.pending.clear()
+                break
+            job = self.pending.pop(reply.get("id"), None)
+            if job is not None:
+                done.append((job, reply))
+
+        if done and not self.pending:
+            self.idle_since = time.monotonic()
+        return done
+
+
+    def waiting(self) -> list:
+        """
+        Return jobs sent, but not started yet (all pending except the first).
+        """
+        return list(self.pending.values())[1:]
+
+
+    def idle(self) -> float:
+        """
+        Seconds without pending jobs, 0 if busy.
+        """
+        return 0.0 if self.pending else time.monotonic() - self.idle_since
+
+
+    def stop(self):
+        """
+        Close stdin, the daemon exits after its current job.
+        """
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
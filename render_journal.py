@@ -0,0 +1,260 @@
+# Copyright (C) 2019 h0bB1T
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+#
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import glob, json, os, socket, time
+
+from typing                 import Dict, Tuple
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+
+from . catalog              import cache_folder
+from . render_queue         import PRIORITY_EXPORT, PRIORITY_NORMAL
+
+# Increase if the line format changes, older journals are dropped then.
+JOURNAL_VERSION = 1
+
+
+def lock_file(f) -> bool:
+    """
+    Lock the open file exclusively, without waiting. Returns False if another
+    process holds the lock. The lock is released when the file is closed.
+    """
+    try:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def read_journal(filename: str) -> Dict[Tuple[str, str], int]:
+    """
+    Return { job: priority } of the jobs left unfinished in a journal file.
+    Jobs that were being rendered get the highest priority.
+    """
+    jobs = {}
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            lines = iter(f)
+            if json.loads(next(lines, "{}")).get("version") == JOURNAL_VERSION:
+                counts = {}
+                for line in lines:
+                    try:
+                        record = json.loads(line)
+                        op, job = record["op"], tuple(record["job"])
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                    if op == "add":
+                        jobs[job] = min(jobs.get(job, PRIORITY_NORMAL), record.get("priority", PRIORITY_NORMAL))
+                        counts[job] = counts.get(job, 0) + 1
+                    elif job not in jobs:
+                        continue
+                    elif op == "start":
+                        jobs[job] = PRIORITY_EXPORT
+                    elif op in ("done", "cancel"):
+                        counts[job] -= 1
+                        if not counts[job]:
+                            del jobs[job], counts[job]
+    except (OSError, ValueError, AttributeError):
+        pass
+    return jobs
+
+
+class RenderJournal:
+    """
+    Append-only log of the render queue, so unfinished jobs survive quitting or a
+    crash of Blender. Each session writes its own file
+    <root>/.asset_wizard/render_queue/<host>-<pid>-<time>.jsonl and holds a lock on
+    the .lock file next to it while running, so sessions sharing a library don't
+    touch each others journals. Journals whose lock is free were left by ended
+    sessions, they're taken over on load.
+    After a version line, each line is { "op": "add" | "start" | "done" | "cancel",
+    "job": [ asset_type, entry ], "priority" }, flushed when written. A torn last
+    line (crash while writing) is ignored. The file is removed when no job is left.
+    jobs = { job: [ priority, count ] } of unfinished jobs, in order of addition. A job
+    added again while it's rendered counts twice, so the first "done" doesn't drop it.
+    """
+    def __init__(self, root: str):
+        self.root = root
+        self.jobs = {}
+        self.file = None
+        self.lock = None
+        self.session = f"{socket.gethostname()}-{os.getpid()}-{int(time.time())}"
+
+
+    def journal_folder(self) -> str:
+        return os.path.join(cache_folder(self.root), "render_queue")
+
+
+    def journal_file(self) -> str:
+        return os.path.join(self.journal_folder(), self.session + ".jsonl")
+
+
+    def acquire(self):
+        """
+        Create and lock the .lock file of this session, once.
+        """
+        if self.lock:
+            return
+        filename = os.path.join(self.journal_folder(), self.session + ".lock")
+        os.makedirs(self.journal_folder(), exist_ok=True)
+        self.lock = open(filename, "a+")
+        if not lock_file(self.lock):
+            print(f"Can't lock render journal: {filename}")
+
+
+    def load(self) -> Dict[Tuple[str, str], int]:
+        """
+        Take over the jobs left unfinished by ended sessions, their journals are
+        merged into the one of this session. Journals of running sessions are skipped.
+        """
+        try:
+            self.acquire()
+        except OSError as ex:
+            print(f"Can't write render journal: {self.journal_folder()} ({ex})")
+            return {}
+
+        folder = self.journal_folder()
+        sessions = {
+            os.path.splitext(os.path.basename(f))[0]
+                for f in glob.glob(os.path.join(glob.escape(folder), "*.jsonl")) + glob.glob(os.path.join(glob.escape(folder), "*.lock"))
+        }
+        sessions.discard(self.session)
+
+        jobs = {}
+        for session in sorted(sessions):
+            filename = os.path.join(folder, session + ".jsonl")
+            lock = os.path.join(folder, session + ".lock")
+            try:
+                with open(lock, "a+") as f:
+                    if not lock_file(f):
+                        continue
+                    if os.path.exists(filename):
+                        for job, priority in read_journal(filename).items():
+                            jobs[job] = min(jobs.get(job, priority), priority)
+                        # Merged before the ended session's journal is removed.
+                        for job, priority in jobs.items():
+                            if job not in self.jobs:
+                                self.jobs[job] = [ priority, 1 ]
+                        self.rewrite()
+                        os.remove(filename)
+                os.remove(lock)
+            except OSError:
+                pass
+        return jobs
+
+
+    def rewrite(self):
+        """
+        Replace the journal by the unfinished jobs, remove it if there are none.
+        """
+        self.close_file()
+        filename = self.journal_file()
+        try:
+            if not self.jobs:
+                if os.path.exists(filename):
+                    os.remove(filename)
+                return
+            self.acquire()
+            tmp = f"{filename}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(json.dumps({ "version": JOURNAL_VERSION }) + "\n")
+                for job, (priority, count) in self.jobs.items():
+                    for _ in range(count):
+                        f.write(json.dumps({ "op": "add", "job": job, "priority": priority }) + "\n")
+            os.replace(tmp, filename)
+        except OSError as ex:
+            print(f"Can't write render journal: {filename} ({ex})")
+
+
+    def record(self, op: str, job: Tuple[str, str], priority: int = PRIORITY_NORMAL):
+        """
+        Log op ("add", "start", "done" or "cancel") of job.
+        """
+        if op == "add":
+            entry = self.jobs.setdefault(job, [ priority, 0 ])
+            entry[0] = min(entry[0], priority)
+            entry[1] += 1
+        elif job not in self.jobs:
+            return
+        elif op == "start":
+            self.jobs[job][0] = PRIORITY_EXPORT
+        elif op in ("done", "cancel"):
+            self.jobs[job][1] -= 1
+            if not self.jobs[job][1]:
+                del self.jobs[job]
+                if not self.jobs:
+                    # Queue completed, nothing to resume.
+                    self.rewrite()
+                    return
+
+        try:
+            if not self.file:
+                self.acquire()
+                filename = self.journal_file()
+                new = not os.path.exists(filename)
+                self.file = open(filename, "a", encoding="utf-8")
+                if new:
+                    self.file.write(json.dumps({ "version": JOURNAL_VERSION }) + "\n")
+            self.file.write(json.dumps({ "op": op, "job": job, "priority": priority }) + "\n")
+            self.file.flush()
+        except OSError as ex:
+            print(f"Can't write render journal: {self.journal_file()} ({ex})")
+            self.close_file()
+
+
+    def discard(self, jobs):
+        """
+        Drop one occurrence of each given job without rendering it.
+        """
+        for job in jobs:
+            entry = self.jobs.get(job)
+            if entry:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self.jobs[job]
+        self.rewrite()
+
+
+    def close_file(self):
+        if self.file:
+            try:
+                self.file.close()
+            except OSError:
+                pass
+            self.file = None
+
+
+    def close(self):
+        """
+        Close the journal and end the session, an empty journal leaves no files.
+        """
+        self.close_file()
+        if self.lock:
+            self.lock.close()
+            self.lock = None
+            if not self.jobs:
+                try:
+                    os.remove(os.path.join(self.journal_folder(), self.session + ".lock"))
+                except OSError:
+                    pass
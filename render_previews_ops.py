@@ -16,18 +16,40 @@
 
 import bpy, os
 
+from typing                 import Tuple
 from bpy.types              import Operator
-from bpy.props              import BoolProperty
+from bpy.props              import BoolProperty, StringProperty
 
 from . preferences          import PreferencesPanel
-from . execute_blender      import run_preview_render
-from . preview_parsers      import CollectionImageParser
+from . render_daemon        import RenderDaemon
+from . render_queue         import RenderQueue, PRIORITY_EXPORT, PRIORITY_SHOWN, PRIORITY_NORMAL
+from . render_journal       import RenderJournal
+from . preview_parsers      import CollectionImageParser, update_pack
 from . utils                import (CategoriesCache, categories, categories_enum, parse_entry_list, split_entry, 
-                                        ASSET_TYPE_OBJECT, ASSET_TYPE_MATERIAL)
+                                        entry_category, ASSET_TYPE_OBJECT, ASSET_TYPE_MATERIAL)
+from . preview_helper       import PreviewHelper
+from . blend_info           import BlendInfoCache
+from . preview_state        import PreviewHashes, preview_stale, SAVE_INTERVAL
 from . properties           import Properties
+from . common_utils         import redraw_3d_views
 
 running = False
 
+# Cores per render process if the number of processes isn't set in the preferences.
+RENDER_THREADS_AUTO = 4
+
+# Jobs sent ahead to a render process, so it can continue without waiting for the UI.
+RENDER_DAEMON_QUEUE = 2
+
+# Seconds after which an idle render process is stopped (frees its memory).
+RENDER_DAEMON_IDLE = 600
+
+# Queued jobs listed (with cancel button) below the render status.
+RENDER_QUEUE_SHOWN = 5
+
+# Seconds between checks if the asset root changed, its render journal is opened then.
+JOURNAL_CHECK_INTERVAL = 2.0
+
 class ModalTimerOperator(Operator):
     """
     Used to track background rendering.
@@ -63,96 +85,312 @@ class ModalTimerOperator(Operator):
         context.window_manager.event_timer_remove(self.timer)
 
 
+def render_workers() -> Tuple[int, int]:
+    """
+    Return (number of render processes, threads per process). Without a
+    preference, a process is started per RENDER_THREADS_AUTO cores.
+    """
+    cores = os.cpu_count() or 1
+    workers = PreferencesPanel.get().render_workers or max(1, cores // RENDER_THREADS_AUTO)
+    return (workers, max(1, cores // workers))
+
+
 class RenderPreviews:
     def __init__(self):
-        # (asset_type, full path)
-        self.jobs = []
+        # (asset_type, full path), waiting for a render process.
+        self.jobs = RenderQueue()
+
+        # Render processes (RenderDaemon), kept running across jobs.
+        self.daemons = []
+
+        # Id of the last job sent to a render process.
+        self.job_id = 0
 
-        # subprocess.Popen
-        self.process = None 
+        # RenderJournal of the current asset root, opened on first use.
+        self.journal = None
+
+        # { job: priority } left unfinished by an earlier session, until resumed or discarded.
+        self.interrupted = {}
+
+
+    def finish(self, job, reply):
+        """
+        Refresh after a job's preview has been rendered. The asset hash is only
+        recorded if the render succeeded, after a failed one the old preview is left.
+        """
+        # Refresh the category of the job only, view if preview currently selected.
+        asset_type, entry = job
+        if asset_type in (ASSET_TYPE_OBJECT, ASSET_TYPE_MATERIAL):
+            category = entry_category(asset_type, entry)
+            CategoriesCache.invalidate(asset_type, [ category ])
+            PreviewHelper.invalidateData((asset_type, category))
+            if PreferencesPanel.get().use_thumbnail_packs:
+                update_pack(asset_type, category)
+            if PreferencesPanel.get().stale_preview_hash:
+                asset, preview = split_entry(entry)[:2]
+                hashes = PreviewHashes.get(PreferencesPanel.get().root)
+                if reply.get("ok") and os.path.exists(preview):
+                    hashes.record(asset, preview)
+                else:
+                    hashes.forget(asset)
+
+        if asset_type == ASSET_TYPE_OBJECT:
+            if entry == Properties.get().selected_entry(ASSET_TYPE_OBJECT):
+                bpy.ops.asset_wizard.refresh_object_previews_op()
+        elif asset_type == ASSET_TYPE_MATERIAL:
+            if entry == Properties.get().selected_entry(ASSET_TYPE_MATERIAL):
+                bpy.ops.asset_wizard.refresh_material_previews_op()
 
 
     def poll(self):
         """
-        Check if render process is active. If completed, cleanup.
-        Start next if there's one on the pipe.
+        Read results of the render processes and refresh the rendered previews.
+        Send next jobs to the processes, start new ones if there are free workers.
         """
-        if self.process:
-            # Job is active. Check if it has completed
-            if self.process.poll() != None:
-                # It has, reset.
-                self.process = None 
+        changed = False
+        for daemon in list(self.daemons):
+            for job, reply in daemon.results():
+                self.report(job, reply)
+                self.record("done", job)
+                self.finish(job, reply)
+                changed = True
+            if not daemon.alive:
+                # Jobs queued behind a crashed one are rendered by another process.
+                for job in daemon.dropped:
+                    if not self.jobs.push(job, PRIORITY_EXPORT):
+                        # Queued again meanwhile, that instance has its own journal entry.
+                        self.record("cancel", job)
+                self.daemons.remove(daemon)
+
+        workers, threads = render_workers()
+        for daemon in list(self.daemons):
+            # Stop surplus (preference changed) and long unused processes.
+            if not daemon.pending and (len(self.daemons) > workers or daemon.idle() > RENDER_DAEMON_IDLE):
+                daemon.stop()
+                self.daemons.remove(daemon)
+
+        while self.jobs:
+            daemon = min(self.daemons, key=lambda d: len(d.pending), default=None)
+            if (not daemon or daemon.pending) and len(self.daemons) < workers:
+                daemon = RenderDaemon(threads)
+                self.daemons.append(daemon)
+            elif len(daemon.pending) >= RENDER_DAEMON_QUEUE:
+                break
+
+            job, priority = self.jobs.pop()
+            asset_type, entry = job
+            self.job_id += 1
+            if not daemon.submit(self.job_id, job, entry, split_entry(entry)[1],
+                    asset_type, PreferencesPanel.get().preview_engine):
+                # Process has gone, it's removed on its exit reply.
+                self.jobs.push(job, priority)
+                break
+            self.record("start", job, priority)
+            if PreferencesPanel.get().stale_preview_hash:
+                PreviewHashes.get(PreferencesPanel.get().root).hash_async(split_entry(entry)[0])
+            changed = True
+
+        # Hashes of rendered assets are written in batches, all once the queue is done.
+        if PreferencesPanel.get().stale_preview_hash:
+            idle = not self.jobs and not any(daemon.pending for daemon in self.daemons)
+            PreviewHashes.get(PreferencesPanel.get().root).save(0.0 if idle else SAVE_INTERVAL)
+
+        # Force UI redraw (status display).
+        if changed and bpy.context.area:
+            bpy.context.area.tag_redraw()
+
+
+    def report(self, job, reply):
+        if reply.get("ok"):
+            print("Rendered preview of %s (%.2fs)" % (job[1], reply.get("time", 0.0)))
+        else:
+            print("Can't render preview of %s (%s)" % (job[1], reply.get("error")))
 
-                # Refresh view (if preview currently selected).
-                if self.jobs[0][0] == ASSET_TYPE_OBJECT:
-                    CategoriesCache.update_cache(ASSET_TYPE_OBJECT)
-                    if self.jobs[0][1] == Properties.get().iobj_previews:
-                        bpy.ops.asset_wizard.refresh_object_previews_op()
-                elif self.jobs[0][0] == ASSET_TYPE_MATERIAL:
-                    CategoriesCache.update_cache(ASSET_TYPE_MATERIAL)
-                    if self.jobs[0][1] == Properties.get().imat_previews:
-                        bpy.ops.asset_wizard.refresh_material_previews_op()
-                
-                self.jobs.pop(0)
 
-                # Force UI redraw (status display).
-                if bpy.context.area:
-                    bpy.context.area.tag_redraw()
+    def shutdown(self):
+        """
+        Stop all render processes, queued jobs are dropped (but kept in the
+        journal, so they can be resumed).
+        """
+        for daemon in self.daemons:
+            daemon.stop()
+        self.daemons.clear()
+        self.jobs.clear()
+        for hashes in PreviewHashes.instances.values():
+            hashes.flush()
+        if self.journal:
+            self.journal.close()
 
-        # If None, we can start a new one.
-        if not self.process and self.jobs:
-            self.process = run_preview_render(
-                self.jobs[0][0],
-                self.jobs[0][1],
-                PreferencesPanel.get().preview_engine
-            )
 
-            # Force UI redraw (status display).
-            if bpy.context.area:
-                bpy.context.area.tag_redraw()
+    def open_journal(self):
+        """
+        Return journal of the current asset root, None if there is no root. When
+        opened, unfinished jobs of earlier sessions are offered for resume. This
+        touches the journals of other sessions, so it's done by check_journal
+        (timer) and when jobs are recorded, never while drawing.
+        """
+        root = PreferencesPanel.get().root
+        if not root or not os.path.isdir(root):
+            return None
+        if not self.journal or self.journal.root != root:
+            if self.journal:
+                self.journal.close()
+            self.journal = RenderJournal(root)
+            self.interrupted = self.journal.load()
+        return self.journal
+
+
+    def sent(self, job):
+        """
+        Check if job has been sent to a render process.
+        """
+        return any(job in daemon.pending.values() for daemon in self.daemons)
+
+
+    def record(self, op, job, priority=PRIORITY_NORMAL):
+        journal = self.open_journal()
+        if journal:
+            journal.record(op, job, priority)
+
+
+    def interrupted_jobs(self):
+        """
+        Return number of jobs left unfinished by an earlier session, as found
+        when the journal was opened. Called while drawing, reads no files.
+        """
+        return len(self.interrupted)
 
 
-    def add_job(self, asset_type, filename):
+    def resume(self):
         """
-        Add new job for preview rendering.
+        Queue the jobs of an earlier session again, without rescanning the library.
         """
         # (Eventually) start modal timer.
         bpy.ops.asset_wizard.modal_timer_op()
 
-        self.jobs.append((asset_type, filename))
+        # The journal entry of an interrupted job stands for its queued instance, it's
+        # dropped if the job has already been queued (or sent) again in this session.
+        duplicates = [ job for job, priority in self.interrupted.items() if self.sent(job) or not self.jobs.push(job, priority) ]
+        if self.journal and duplicates:
+            self.journal.discard(duplicates)
+        self.interrupted = {}
         self.poll()
 
 
-    def parse_render_list(self, root, asset_type, rerender):
+    def discard(self):
+        """
+        Drop the jobs of an earlier session.
+        """
+        if self.journal:
+            # Jobs queued again in this session have their own journal entry.
+            self.journal.discard(self.interrupted)
+        self.interrupted = {}
+
+
+    def add_job(self, asset_type, filename, start=True, priority=None):
+        """
+        Add new job for preview rendering. Without start, jobs are only queued
+        until the next poll(). Without priority, jobs of the currently shown
+        category are rendered first. Jobs already waiting aren't added again.
+        """
+        # (Eventually) start modal timer.
+        bpy.ops.asset_wizard.modal_timer_op()
+
+        job = (asset_type, filename)
+        if any(job in daemon.waiting() for daemon in self.daemons):
+            return
+        if priority is None:
+            priority = PRIORITY_NORMAL
+            if asset_type in (ASSET_TYPE_OBJECT, ASSET_TYPE_MATERIAL):
+                if entry_category(asset_type, filename) == Properties.get().shown_category(asset_type):
+                    priority = PRIORITY_SHOWN
+        if self.jobs.push(job, priority):
+            self.record("add", job, priority)
+        if start:
+            self.poll()
+
+
+    def cancel_job(self, asset_type, filename):
+        """
+        Remove a queued job, jobs already sent to a render process are completed.
+        """
+        if self.jobs.remove((asset_type, filename)):
+            self.record("cancel", (asset_type, filename))
+
+
+    def cancel_all(self):
+        """
+        Remove all queued jobs, jobs already sent to a render process are completed.
+        """
+        if self.journal:
+            self.journal.discard(self.jobs)
+        self.jobs.clear()
+
+
+    def queued(self, count=RENDER_QUEUE_SHOWN):
+        """
+        Return the next count queued jobs, in render order.
+        """
+        return self.jobs.first(count)
+
+
+    def parse_render_list(self, root, asset_type, rerender, stale=False):
         """
         Adds all files that need to be preview rendered to job list.
+        With stale, previews older than their asset are rendered too (if the
+        stale_preview_hash preference is set, only if the asset content changed).
         """
+        hashes = PreviewHashes.get(root) if stale and PreferencesPanel.get().stale_preview_hash else None
         for category in categories_enum(asset_type):
             for entry in parse_entry_list(asset_type, category[0]):
                 if rerender:
-                    self.add_job(asset_type, entry)
+                    self.add_job(asset_type, entry, False)
                 else:
-                    preview = split_entry(entry)[1]
+                    asset, preview = split_entry(entry)[:2]
                     if not os.path.exists(preview):
-                        self.add_job(asset_type, entry)
+                        self.add_job(asset_type, entry, False)
+                    elif stale and preview_stale(asset, preview):
+                        if not hashes or hashes.changed(asset, preview):
+                            self.add_job(asset_type, entry, False)
+        if hashes:
+            hashes.save()
+        BlendInfoCache.get(root).save()
 
 
-    def generate_render_list(self, rerender):
+    def generate_render_list(self, rerender, stale=False):
         """
         Generate full render list in job list.
         """
         prefs = PreferencesPanel.get()
         for asset_type in ( ASSET_TYPE_OBJECT, ASSET_TYPE_MATERIAL ):
-            self.parse_render_list(prefs.root, asset_type, rerender)
+            self.parse_render_list(prefs.root, asset_type, rerender, stale)
+        self.poll()
 
 
     def status(self):
-        if self.jobs:
-            return "Render queue (%i to render)::Current: %s" % (len(self.jobs), os.path.basename(self.jobs[0][1]))
+        rendering = [ next(iter(d.pending.values())) for d in self.daemons if d.pending ]
+        if rendering:
+            pending = sum(len(d.pending) for d in self.daemons)
+            lines = [ "Render queue (%i to render)" % (len(self.jobs) + pending) ]
+            lines.extend("Current: %s" % os.path.basename(job[1]) for job in rendering)
+            return "::".join(lines)
         else:
             return None
 
 
+def check_journal():
+    """
+    Timer callback, opens the render journal of the asset root on start and when
+    the root changed. Returns time to next call.
+    """
+    render_previews = bpy.context.window_manager.asset_wizard_render_previews
+    journal = render_previews.journal
+    if render_previews.open_journal() is not journal and render_previews.interrupted:
+        # Show resume/discard buttons.
+        redraw_3d_views()
+    return JOURNAL_CHECK_INTERVAL
+
+
 class RenderPreviewsOperator(Operator):
     bl_idname = "asset_wizard.render_previews_op"
     bl_label = "Render"
@@ -163,6 +401,16 @@ class RenderPreviewsOperator(Operator):
         return{'FINISHED'}    
 
 
+class RenderStalePreviewsOperator(Operator):
+    bl_idname = "asset_wizard.render_stale_previews_op"
+    bl_label = "Render stale"
+    bl_description = "Render missing previews and previews of assets modified after their preview was rendered"
+
+    def execute(self, context):
+        Properties.get_render_previews().generate_render_list(False, True)
+        return{'FINISHED'}    
+
+
 class RenderAllPreviewsOperator(Operator):
     bl_idname = "asset_wizard.render_all_previews_op"
     bl_label = "Render ALL"
@@ -174,3 +422,46 @@ class RenderAllPreviewsOperator(Operator):
 
     def invoke(self, context, event):
         return context.window_manager.invoke_confirm(self, event)      
+
+
+class CancelRenderJobOperator(Operator):
+    bl_idname = "asset_wizard.cancel_render_job_op"
+    bl_label = "Cancel"
+    bl_description = "Remove this preview from the render queue"
+
+    asset_type: StringProperty()
+    entry: StringProperty()
+
+    def execute(self, context):
+        Properties.get_render_previews().cancel_job(self.asset_type, self.entry)
+        return{'FINISHED'}
+
+
+class CancelRenderQueueOperator(Operator):
+    bl_idname = "asset_wizard.cancel_render_queue_op"
+    bl_label = "Cancel all"
+    bl_description = "Remove all waiting previews from the render queue, current renders are completed"
+
+    def execute(self, context):
+        Properties.get_render_previews().cancel_all()
+        return{'FINISHED'}
+
+
+class ResumeRenderQueueOperator(Operator):
+    bl_idname = "asset_wizard.resume_render_queue_op"
+    bl_label = "Resume"
+    bl_description = "Render the previews left unfinished when Blender was closed"
+
+    def execute(self, context):
+        Properties.get_render_previews().resume()
+        return{'FINISHED'}
+
+
+class DiscardRenderQueueOperator(Operator):
+    bl_idname = "asset_wizard.discard_render_queue_op"
+    bl_label = "Discard"
+    bl_description = "Forget the previews left unfinished when Blender was closed"
+
+    def execute(self, context):
+        Properties.get_render_previews().discard()
+        return{'FINISHED'}
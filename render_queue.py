@@ -0,0 +1,106 @@
+# Copyright (C) 2019 h0bB1T
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+#
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import heapq
+
+from typing                 import List, Tuple
+
+# Job priorities, lower ones are rendered first.
+PRIORITY_EXPORT = 0     # Just exported/generated or explicitly rerendered.
+PRIORITY_SHOWN = 1      # In the currently shown category.
+PRIORITY_NORMAL = 2
+
+
+class RenderQueue:
+    """
+    Render jobs (asset_type, entry) by priority, in order of addition within a
+    priority. A job is queued only once, adding it again can only raise its
+    priority. Removed/reprioritized jobs are left in the heap and skipped on pop.
+    heap = [ [ priority, sequence, job, valid ] ]
+    entries = { job: heap item }
+    """
+    def __init__(self):
+        self.heap = []
+        self.entries = {}
+        self.sequence = 0
+
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+    def __contains__(self, job) -> bool:
+        return job in self.entries
+
+
+    def __iter__(self):
+        return iter(list(self.entries))
+
+
+    def push(self, job: Tuple[str, str], priority: int = PRIORITY_NORMAL) -> bool:
+        """
+        Queue job, returns False if it was queued already.
+        """
+        item = self.entries.get(job)
+        if item:
+            if priority < item[0]:
+                item[3] = False
+                self.add(job, priority)
+            return False
+        self.add(job, priority)
+        return True
+
+
+    def add(self, job, priority: int):
+        self.sequence += 1
+        item = [ priority, self.sequence, job, True ]
+        self.entries[job] = item
+        heapq.heappush(self.heap, item)
+
+
+    def pop(self) -> Tuple[Tuple[str, str], int]:
+        """
+        Remove and return (job, priority) of the next job, (None, None) if empty.
+        """
+        while self.heap:
+            priority, _, job, valid = heapq.heappop(self.heap)
+            if valid:
+                del self.entries[job]
+                return (job, priority)
+        return (None, None)
+
+
+    def remove(self, job) -> bool:
+        """
+        Cancel job, returns False if it isn't queued.
+        """
+        item = self.entries.pop(job, None)
+        if not item:
+            return False
+        item[3] = False
+        return True
+
+
+    def clear(self):
+        self.heap.clear()
+        self.entries.clear()
+
+
+    def first(self, count: int) -> List[Tuple[str, str]]:
+        """
+        Return the next count jobs, in render order.
+        """
+        return [ item[2] for item in heapq.nsmallest(count, self.entries.values()) ]
@@ -14,10 +14,17 @@
 # along with this program; if not, write to the Free Software Foundation,
 # Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
 
-import bpy, sys, os
+import bpy, json, sys, os, time
 
 sys.path.append(os.path.dirname(__file__))
 
+# bpy.data collections kept as they are between jobs (UI data), datablocks
+# added by a job to all other collections are removed afterwards.
+KEPT_COLLECTIONS = ( "window_managers", "screens", "workspaces" )
+
+# Prefix of daemon replies on stdout, all other lines are Blender's own output.
+REPLY_PREFIX = "@asset_wizard "
+
 #from common_utils           import calc_bounding_box
 
 class PreviewRenderer:
@@ -59,8 +66,8 @@ class PreviewRenderer:
 
 
     def prepare_object_scene(self):
-        # Remove material preview object.
-        bpy.data.objects.remove(bpy.data.objects["Preview"])
+        # Hide material preview object (restored for the next job of a batch).
+        bpy.data.objects["Preview"].hide_render = True
 
         # Deselect all objects.
         [ o.select_set(False) for o in bpy.context.scene.objects ]
@@ -97,8 +104,78 @@ class PreviewRenderer:
         bpy.ops.render.render(write_still=True)
 
 
+class SceneState:
+    """
+    State of preview.blend before the first job, restored after each job of a
+    render process: imported datablocks are removed, preview object and camera reset.
+    All ID collections of bpy.data are tracked (particles, grease pencils, fonts, worlds, ..),
+    read from its RNA, so the list matches the running Blender version.
+    """
+    def __init__(self):
+        self.collections = [
+            p.identifier for p in bpy.data.bl_rna.properties
+                if p.type == 'COLLECTION' and p.identifier not in KEPT_COLLECTIONS
+        ]
+        self.ids = { c: { i.as_pointer() for i in getattr(bpy.data, c) } for c in self.collections }
+        self.material = bpy.data.objects["Preview"].material_slots[0].material
+        self.camera = bpy.context.scene.camera.matrix_world.copy()
+
+
+    def restore(self):
+        preview = bpy.data.objects["Preview"]
+        preview.hide_render = False
+        preview.material_slots[0].material = self.material
+        bpy.context.scene.camera.matrix_world = self.camera
+
+        added = [
+            i for c in self.collections for i in getattr(bpy.data, c)
+                if i.as_pointer() not in self.ids[c]
+        ]
+        bpy.data.batch_remove(added)
+
+
+def reply(message):
+    # Starts on a new line, Blender's (buffered) output may have left a partial one.
+    sys.stdout.write("\n" + REPLY_PREFIX + json.dumps(message) + "\n")
+    sys.stdout.flush()
+
+
+def serve():
+    """
+    Render jobs read as JSON lines from stdin until it's closed. Each job
+    { "id", "asset", "preview", "asset_type", "engine" } is answered by
+    REPLY_PREFIX { "id", "ok", "time", "error" } on stdout.
+    """
+    state = SceneState()
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        start, error, job = time.perf_counter(), None, {}
+        try:
+            job = json.loads(line)
+            print("Render: ", job["asset"])
+            PreviewRenderer(job["asset"], job["preview"], job["asset_type"], job["engine"]).prepare_and_render()
+        except Exception as ex:
+            error = str(ex)
+            print(f"Can't render preview of {job.get('asset')} ({ex})")
+        state.restore()
+        reply({
+            "id": job.get("id"),
+            "ok": error is None,
+            "time": time.perf_counter() - start,
+            "error": error
+        })
+
+
+# Started by execute_blender.run_render_daemon:
+#   blender --background --factory-startup preview.blend --python render_script.py -- --daemon
+# Single preview, e.g. for testing by hand:
+#   blender --background --factory-startup preview.blend --python render_script.py -- [asset] [preview.png] [asset_type] [engine]
 def main(args):
     print("Script args: ", args)
+    if args and args[0] == "--daemon":
+        serve()
+        return
     inFile, outFile, asset_type, engine = args
     PreviewRenderer(inFile, outFile, asset_type, engine).prepare_and_render()
 
@@ -0,0 +1,174 @@
+# Copyright (C) 2019 h0bB1T
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+#
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import os
+
+from array                  import array
+from collections            import defaultdict
+from typing                 import List, Tuple
+
+from . asset_table          import AssetTable
+from . blend_info           import BlendInfoCache
+from . utils                import CategoriesCache, parse_entry_list, ASSET_TYPE_OBJECT, ASSET_TYPE_MATERIAL
+from . asset_metadata       import MetadataIndex, parse_filters, metadata_matches
+
+# Minimal fraction of query trigrams a match must contain.
+MIN_SIMILARITY = 0.6
+
+
+def trigrams(text: str) -> set:
+    """
+    Trigrams of the (lower case) text, padded so word starts are weighted.
+    """
+    padded = f"  {text} "
+    return { padded[i:i + 3] for i in range(len(padded) - 2) }
+
+
+class SearchIndex:
+    """
+    Trigram index over assets (IDs of the AssetTable) and their searchable text
+    (label and category). Matches are ranked by trigram similarity, substring
+    matches of label first.
+    """
+    def __init__(self):
+        self.docs = array('I')
+        self.texts = []
+        self.postings = defaultdict(lambda: array('I'))
+
+
+    def add(self, aid: int, text: str):
+        doc = len(self.docs)
+        text = text.lower()
+        self.docs.append(aid)
+        self.texts.append(text)
+        for t in trigrams(text):
+            self.postings[t].append(doc)
+
+
+    def search(self, query: str, limit: int) -> List[int]:
+        """
+        Return up to limit (None: all) asset IDs best matching the query.
+        An empty query matches everything.
+        """
+        query = query.strip().lower()
+        if not query:
+            return self.docs[:limit].tolist()
+
+        if len(query) < 3:
+            # Too short for trigrams, plain substring search.
+            hits = [ d for d, text in enumerate(self.texts) if query in text ]
+            scored = [ (1.0, d) for d in hits ]
+        else:
+            grams = trigrams(query)
+            counts = defaultdict(int)
+            for t in grams:
+                for d in self.postings.get(t, ()):
+                    counts[d] += 1
+            needed = MIN_SIMILARITY * len(grams)
+            scored = [ (c / len(grams), d) for d, c in counts.items() if c >= needed ]
+
+        def rank(item):
+            score, d = item
+            label = AssetTable.label_of(self.docs[d]).lower()
+            return (
+                not label.startswith(query),
+                query not in label,
+                query not in self.texts[d],
+                -score,
+                len(label)
+            )
+
+        scored.sort(key=rank)
+        return [ self.docs[d] for _, d in scored[:limit] ]
+
+
+class LibrarySearch:
+    """
+    Search index over all object and material assets, rebuilt when
+    the category structure changes.
+    """
+    index = None
+    versions = None
+    # AssetTable folder index -> (asset_type, category).
+    categories = {}
+    # AssetTable key -> (asset_type, category) of the last search.
+    hits = {}
+
+    @staticmethod
+    def build() -> SearchIndex:
+        index = SearchIndex()
+        LibrarySearch.categories = {}
+        for asset_type in (ASSET_TYPE_OBJECT, ASSET_TYPE_MATERIAL):
+            catalog = CategoriesCache.catalog(asset_type)
+            for category in sorted(catalog.folders):
+                # Assets in the root folder aren't listed by the importer (no category to select).
+                if not category:
+                    continue
+                path = os.path.join(catalog.base_path(), category)
+                LibrarySearch.categories[AssetTable.folder_id(path)] = (asset_type, category)
+                # Same entries as the importer shows (path/abc.blend::Material).
+                for entry in parse_entry_list(asset_type, category):
+                    fullname, _, mat = entry.partition("::")
+                    f = os.path.basename(fullname)
+                    label = os.path.splitext(f)[0]
+                    if mat:
+                        index.add(AssetTable.add(path, f, mat), f"{label}:{mat} {category}")
+                    else:
+                        index.add(AssetTable.add(path, f), f"{label} {category}")
+            BlendInfoCache.get(catalog.root).save()
+        return index
+
+
+    @staticmethod
+    def resolve(aid: int) -> Tuple[str, str, str, str]:
+        """
+        Return (entry, label, asset_type, category) of an indexed asset.
+        """
+        fid = AssetTable.entries[aid][0]
+        return (AssetTable.entry_of(aid), AssetTable.label_of(aid)) + LibrarySearch.categories[fid]
+
+
+    @staticmethod
+    def search(query: str, limit: int = 100) -> List[Tuple[str, str, str, str]]:
+        """
+        Search assets, the query may contain metadata filters (see asset_metadata).
+        """
+        # Make sure catalogs are up to date, version changes on any modification.
+        for asset_type in (ASSET_TYPE_OBJECT, ASSET_TYPE_MATERIAL):
+            CategoriesCache.categories(asset_type)
+
+        versions = dict(CategoriesCache.version)
+        if not LibrarySearch.index or LibrarySearch.versions != versions:
+            LibrarySearch.index = LibrarySearch.build()
+            LibrarySearch.versions = versions
+
+        text, filters = parse_filters(query)
+        if filters:
+            metadata = {}
+            for asset_type in (ASSET_TYPE_OBJECT, ASSET_TYPE_MATERIAL):
+                metadata[asset_type] = MetadataIndex.get(CategoriesCache.catalog(asset_type))
+                metadata[asset_type].refresh()
+            result = [
+                doc for doc in map(LibrarySearch.resolve, LibrarySearch.index.search(text, None))
+                    if metadata_matches(metadata[doc[2]].lookup(doc[0].split("::")[0]), filters)
+            ][:limit]
+        elif text:
+            result = [ LibrarySearch.resolve(aid) for aid in LibrarySearch.index.search(text, limit) ]
+        else:
+            result = []
+
+        LibrarySearch.hits = { AssetTable.key_of(entry): (asset_type, category) for entry, _, asset_type, category in result }
+        return result
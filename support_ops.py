@@ -17,11 +17,17 @@
 import bpy, os
 
 from bpy.types              import Operator
+from bpy.props              import IntProperty
 
 from . properties           import Properties, StringProperty
 from . preview_helper       import PreviewHelper
+from . panel_cache          import PanelCache
 from . preferences          import PreferencesPanel
-from . utils                import export_file, CategoriesCache, ASSET_TYPE_OBJECT, ASSET_TYPE_MATERIAL, PREVIEW_EXT
+from . render_queue         import PRIORITY_EXPORT
+from . utils                import export_file, formats_to_parse, page_count, CategoriesCache, ASSET_TYPE_OBJECT, ASSET_TYPE_MATERIAL, PREVIEW_EXT
+from . catalog              import cache_folder, write_json_atomic
+from . common_utils         import metadata_file, METADATA_EXT
+from . execute_blender      import run_metadata_backfill
 
 class RefreshObjectPreviews(Operator):
     bl_idname = "asset_wizard.refresh_object_previews_op"
@@ -29,12 +35,9 @@ class RefreshObjectPreviews(Operator):
     bl_description = "Refresh previews for this category (if e.g. externally modified)"
 
     def execute(self, context):
-        PreviewHelper.setData(
-            ASSET_TYPE_OBJECT, 
-            (ASSET_TYPE_OBJECT, Properties.get().iobj_categories),
-            True
-        )
+        PreviewHelper.invalidateData((ASSET_TYPE_OBJECT, Properties.get().iobj_categories))
         CategoriesCache.update_cache(ASSET_TYPE_OBJECT)
+        PanelCache.invalidate("export_exists")
         return {'FINISHED'}
 
 
@@ -46,7 +49,8 @@ class ReRenderObjectPreview(Operator):
     def execute(self, context):
         Properties.get_render_previews().add_job(
             ASSET_TYPE_OBJECT, 
-            Properties.get().iobj_previews
+            Properties.get().selected_entry(ASSET_TYPE_OBJECT),
+            priority=PRIORITY_EXPORT
         )
         return {'FINISHED'}        
 
@@ -57,11 +61,7 @@ class RefreshMaterialPreviews(Operator):
     bl_description = "Refresh previews for this category (if e.g. externally modified)"
 
     def execute(self, context):
-        PreviewHelper.setData(
-            ASSET_TYPE_MATERIAL, 
-            (ASSET_TYPE_MATERIAL, Properties.get().imat_categories),
-            True
-        )
+        PreviewHelper.invalidateData((ASSET_TYPE_MATERIAL, Properties.get().imat_categories))
         CategoriesCache.update_cache(ASSET_TYPE_MATERIAL)
         return {'FINISHED'}        
 
@@ -74,11 +74,30 @@ class ReRenderMaterialPreview(Operator):
     def execute(self, context):
         Properties.get_render_previews().add_job(
             ASSET_TYPE_MATERIAL, 
-            Properties.get().imat_previews
+            Properties.get().selected_entry(ASSET_TYPE_MATERIAL),
+            priority=PRIORITY_EXPORT
         )
         return {'FINISHED'}        
 
 
+class PreviewPage(Operator):
+    bl_idname = "asset_wizard.preview_page_op"
+    bl_label = "Page"
+    bl_description = "Show next/previous page of previews"
+
+    asset_type: StringProperty()
+    step: IntProperty()
+
+    def execute(self, context):
+        properties = Properties.get()
+        lst = properties.preview_list(self.asset_type)
+        pages = page_count(lst.total)
+        page = min(lst.data[2], pages - 1) + self.step
+        if 0 <= page < pages:
+            properties.select_page(self.asset_type, page)
+        return {'FINISHED'}
+
+
 class RemoveAsset(Operator):
     bl_idname = "asset_wizard.remove_asset_op"
     bl_label = "Remove Asset?"
@@ -107,6 +126,12 @@ class RemoveAsset(Operator):
         except Exception as ex:
             failed = True
 
+        try:
+            if os.path.exists(metadata_file(asset)):
+                os.remove(metadata_file(asset))
+        except Exception as ex:
+            failed = True
+
         if self.asset_type == ASSET_TYPE_OBJECT:
             bpy.ops.asset_wizard.refresh_object_previews_op()
         elif self.asset_type == ASSET_TYPE_MATERIAL:
@@ -122,3 +147,33 @@ class RemoveAsset(Operator):
 
     def invoke(self, context, event):
         return context.window_manager.invoke_confirm(self, event)
+
+
+class BackfillMetadata(Operator):
+    bl_idname = "asset_wizard.backfill_metadata_op"
+    bl_label = "Build Metadata"
+    bl_description = "Write metadata (polycount, dimensions, materials, textures) for all objects " + \
+        "without or with outdated metadata. Runs in background"
+
+    def execute(self, context):
+        catalog = CategoriesCache.catalog(ASSET_TYPE_OBJECT)
+        catalog.refresh()
+
+        assets = []
+        for folder in catalog.folders:
+            files = catalog.files(folder, formats_to_parse(ASSET_TYPE_OBJECT))
+            sidecars = catalog.files(folder, (METADATA_EXT, ))
+            for name, (_, mtime) in files.items():
+                sidecar = sidecars.get(metadata_file(name))
+                if not sidecar or sidecar[1] < mtime:
+                    assets.append(os.path.join(catalog.base_path(), folder, name))
+
+        if not assets:
+            self.report({'INFO'}, "Metadata is up to date")
+            return {'FINISHED'}
+
+        asset_list = os.path.join(cache_folder(catalog.root), f"backfill_{os.getpid()}.json")
+        write_json_atomic(asset_list, assets)
+        run_metadata_backfill(asset_list)
+        self.report({'INFO'}, f"Writing metadata for {len(assets)} assets in background")
+        return {'FINISHED'}
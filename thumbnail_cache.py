@@ -0,0 +1,222 @@
+# Copyright (C) 2019 h0bB1T
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+#
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+import bpy, hashlib, os, struct, threading
+
+from array                  import array
+from typing                 import Tuple
+
+try:
+    import imbuf
+except ImportError: # Blender < 2.82 (and outside of Blender).
+    imbuf = None
+
+from . preferences          import PreferencesPanel
+from . catalog              import cache_folder
+
+# Edge lengths of the stored thumbnails.
+THUMB_SIZES = (128, 256, 512)
+
+# Pixels per UI unit at ui_scale 1.0.
+UI_UNIT = 20
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def png_size(filename: str) -> Tuple[int, int]:
+    """
+    Return (width, height) from the PNG header, None if not a PNG.
+    """
+    with open(filename, "rb") as f:
+        header = f.read(24)
+    if len(header) < 24 or not header.startswith(PNG_SIGNATURE) or header[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", header[16:24])
+
+
+def thumb_size() -> int:
+    """
+    Return smallest thumbnail size covering the previews as displayed
+    (template_icon_view with scale 5.0 * preview_scale).
+    """
+    pixels = 5.0 * PreferencesPanel.get().preview_scale * UI_UNIT * bpy.context.preferences.view.ui_scale
+    for size in THUMB_SIZES:
+        if size >= pixels:
+            return size
+    return THUMB_SIZES[-1]
+
+
+def create_thumbnail(source: str, target: str, size: int) -> bool:
+    """
+    Write downscaled (longer edge = size) copy of source to target with Blender's
+    image library. No bpy data involved, so it may run on a worker thread. Returns
+    False if the imbuf module isn't available, raises OSError if source can't be read.
+    """
+    if not imbuf:
+        return False
+    image = imbuf.load(source)
+    try:
+        w, h = image.size
+        factor = size / max(w, h)
+        image.resize((max(1, round(w * factor)), max(1, round(h * factor))), method='BILINEAR')
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp.png"
+        imbuf.write(image, filepath=tmp)
+        os.replace(tmp, target)
+    finally:
+        image.free()
+    return True
+
+
+def image_pixels(image) -> array:
+    """
+    Copy pixels of a loaded image, the layout of ImagePreview.image_pixels_float
+    (float RGBA, bottom to top).
+    """
+    w, h = image.size
+    pixels = array('f', [ 0.0 ]) * (w * h * 4)
+    try:
+        image.pixels.foreach_get(pixels)
+    except AttributeError: # Blender < 2.83
+        pixels = array('f', image.pixels[:])
+    return pixels
+
+
+def save_thumbnail(image, target: str):
+    """
+    Write image as PNG to target.
+    """
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp.png"
+    image.filepath_raw = tmp
+    image.file_format = 'PNG'
+    image.save()
+    os.replace(tmp, target)
+
+
+def load_pixels(filename: str, size: int, target: str = None) -> Tuple[int, int, array]:
+    """
+    Decode image with Blender, it's downscaled (longer edge = size) if larger. The
+    downscaled copy is written to target (if given, only without imbuf, else the
+    worker thread writes thumbnails). Returns (width, height, pixels), raises
+    RuntimeError if the file can't be loaded. Main thread only.
+    """
+    image = bpy.data.images.load(filename, check_existing=False)
+    try:
+        w, h = image.size
+        if not w or not h:
+            raise RuntimeError(f"Can't decode {filename}")
+        if max(w, h) > size:
+            factor = size / max(w, h)
+            w, h = max(1, round(w * factor)), max(1, round(h * factor))
+            image.scale(w, h)
+            if target:
+                try:
+                    save_thumbnail(image, target)
+                except (OSError, RuntimeError) as ex:
+                    print(f"Can't write thumbnail of {filename} ({ex})")
+        return (w, h, image_pixels(image))
+    finally:
+        bpy.data.images.remove(image)
+
+
+def decode_png(name: str, data: bytes) -> Tuple[int, int, array]:
+    """
+    Decode in-memory PNG (e.g. from a thumbnail pack) with Blender, the data
+    is packed into a temporary image. Main thread only.
+    """
+    image = bpy.data.images.new(name, 8, 8)
+    try:
+        image.pack(data=data, data_len=len(data))
+        image.source = 'FILE'
+        w, h = image.size
+        if not w or not h:
+            raise RuntimeError(f"Can't decode {name}")
+        return (w, h, image_pixels(image))
+    finally:
+        bpy.data.images.remove(image)
+
+
+class ThumbnailCache:
+    """
+    Downscaled copies of the rendered previews, stored below the cache folder:
+    .asset_wizard/thumbs/<size>/<hash of path and mtime>.png
+    A re-rendered preview gets a new key, so outdated thumbnails are never used.
+    """
+
+    @staticmethod
+    def thumb_file(root: str, source: str, mtime_ns: int, size: int) -> str:
+        try:
+            key = os.path.relpath(source, root).replace(os.sep, "/")
+        except ValueError: # Different drive (Windows).
+            key = source
+        digest = hashlib.sha1(f"{key}:{mtime_ns}".encode("utf-8")).hexdigest()
+        return os.path.join(cache_folder(root), "thumbs", str(size), digest[:2], digest + ".png")
+
+
+    @staticmethod
+    def locate(root: str, source: str, size: int) -> Tuple[str, str]:
+        """
+        Return (file to load, thumbnail to create from it): the existing thumbnail,
+        source itself if it's small enough, else source and its missing thumbnail.
+        No bpy used, may run on a worker thread. Returns None if source doesn't exist.
+        """
+        try:
+            mtime = os.stat(source).st_mtime_ns
+        except OSError:
+            return None
+
+        thumb = ThumbnailCache.thumb_file(root, source, mtime, size)
+        if os.path.exists(thumb):
+            return (thumb, None)
+        try:
+            dim = png_size(source)
+        except OSError:
+            return None
+        if dim and max(dim) <= size:
+            return (source, None)
+        return (source, thumb)
+
+
+    @staticmethod
+    def prepare(root: str, source: str, size: int) -> Tuple[str, str]:
+        """
+        Like locate, but a missing thumbnail is created right away (worker thread).
+        The thumbnail is only left to load() if that isn't possible here (no imbuf).
+        """
+        located = ThumbnailCache.locate(root, source, size)
+        if located and located[1]:
+            try:
+                if create_thumbnail(source, located[1], size):
+                    return (located[1], None)
+            except (OSError, ValueError) as ex:
+                print(f"Can't create thumbnail of {source} ({ex})")
+                return None
+        return located
+
+
+    @staticmethod
+    def load(filename: str, thumb: str, size: int) -> Tuple[int, int, array]:
+        """
+        Decode file returned by locate, writing the thumbnail if missing.
+        Returns (width, height, pixels), None if it can't be loaded. Main thread only.
+        """
+        try:
+            return load_pixels(filename, size, thumb)
+        except RuntimeError as ex:
+            print(f"Can't load preview {filename} ({ex})")
+            return None
@@ -0,0 +1,258 @@
+# Copyright (C) 2019 h0bB1T
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+#
+# (at your option) any later version.
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301  USA
+
+# Thumbnail pack: all thumbnails (of one size) of a category in a single file,
+# so loading a category needs one open instead of one per preview.
+#
+# File layout (little endian):
+#   Header:  magic "AWTP", version (uint16), count (uint32)
+#   Index:   count * (mtime_ns (int64), offset (uint64), length (uint32),
+#            width (uint16), height (uint16), name length (uint16), name (utf-8))
+#   Data:    thumbnail PNG files, referenced by offset/length
+# Decoding is left to Blender, packs are written and read without bpy.
+import hashlib, mmap, os, struct, threading, traceback
+
+from typing                 import Dict, List, Tuple
+
+from . catalog              import cache_folder
+from . thumbnail_cache      import ThumbnailCache, png_size
+
+PACK_MAGIC = b"AWTP"
+PACK_VERSION = 2
+
+HEADER = struct.Struct("<4sHI")
+ENTRY = struct.Struct("<qQIHHH")
+
+
+class PackReader:
+    """
+    Memory mapped pack file. The mapping is closed before the pack is replaced
+    (Windows can't replace mapped files), reading then raises ValueError.
+    index = { name: (mtime_ns, offset, length, width, height) }
+    """
+    __slots__ = ("mm", "index")
+
+    def __init__(self, filename: str):
+        with open(filename, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self.index = read_index(self.mm)
+        except (struct.error, ValueError, UnicodeDecodeError):
+            self.mm.close()
+            raise
+
+
+    def find(self, name: str, mtime_ns: int) -> bool:
+        """
+        Check if the pack contains the thumbnail of the given preview version.
+        """
+        entry = self.index.get(name)
+        return entry is not None and entry[0] == mtime_ns
+
+
+    def png(self, name: str) -> bytes:
+        """
+        Return PNG data of the thumbnail.
+        """
+        _, offset, length, _, _ = self.index[name]
+        return self.mm[offset:offset + length]
+
+
+    def close(self):
+        self.mm.close()
+
+
+def read_index(data) -> Dict[str, Tuple[int, int, int, int, int]]:
+    magic, version, count = HEADER.unpack_from(data, 0)
+    if magic != PACK_MAGIC or version != PACK_VERSION:
+        raise ValueError("Unknown pack format")
+
+    index, pos = {}, HEADER.size
+    for _ in range(count):
+        mtime, offset, length, width, height, name_length = ENTRY.unpack_from(data, pos)
+        pos += ENTRY.size
+        name = bytes(data[pos:pos + name_length]).decode("utf-8")
+        pos += name_length
+        if offset + length > len(data):
+            raise ValueError("Truncated pack")
+        index[name] = (mtime, offset, length, width, height)
+    return index
+
+
+def write_pack(filename: str, entries) -> str:
+    """
+    Write pack of entries [(name, mtime_ns, width, height, PNG data), ..] to a
+    temporary file next to filename, returns its name. It's moved in place by
+    the caller, so readers never see partial packs.
+    """
+    names = [ e[0].encode("utf-8") for e in entries ]
+    offset = HEADER.size + sum(ENTRY.size + len(n) for n in names)
+    header = [ HEADER.pack(PACK_MAGIC, PACK_VERSION, len(entries)) ]
+    for (_, mtime, width, height, data), name in zip(entries, names):
+        header.append(ENTRY.pack(mtime, offset, len(data), width, height, len(name)) + name)
+        offset += len(data)
+
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    tmp = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(b"".join(header))
+        for e in entries:
+            f.write(e[4])
+    return tmp
+
+
+class ThumbnailPack:
+    """
+    Access and incremental rebuild of the per category packs, stored as
+    .asset_wizard/packs/<size>/<hash of asset type and category>.pack
+    """
+    # Pack file -> (file mtime, PackReader).
+    readers = {}
+    # Pack file -> rebuild requested while building.
+    building = {}
+    # Guards readers and building, readers are used by the pack builders too.
+    lock = threading.Lock()
+
+    @staticmethod
+    def pack_file(root: str, asset_type: str, category: str, size: int) -> str:
+        digest = hashlib.sha1(f"{asset_type}/{category}".encode("utf-8")).hexdigest()
+        return os.path.join(cache_folder(root), "packs", str(size), digest + ".pack")
+
+
+    @staticmethod
+    def get(root: str, asset_type: str, category: str, size: int) -> PackReader:
+        """
+        Return reader of the category pack, None if there's no (valid) pack.
+        The file is mapped again only if it has been modified.
+        """
+        filename = ThumbnailPack.pack_file(root, asset_type, category, size)
+        with ThumbnailPack.lock:
+            try:
+                mtime = os.stat(filename).st_mtime_ns
+            except OSError:
+                ThumbnailPack.release(filename)
+                return None
+
+            cached = ThumbnailPack.readers.get(filename)
+            if cached and cached[0] == mtime:
+                return cached[1]
+            ThumbnailPack.release(filename)
+            try:
+                reader = PackReader(filename)
+            except (OSError, ValueError, struct.error, UnicodeDecodeError) as ex:
+                print(f"Can't read thumbnail pack {filename} ({ex})")
+                reader = None
+            ThumbnailPack.readers[filename] = (mtime, reader)
+            return reader
+
+
+    @staticmethod
+    def release(filename: str):
+        """
+        Close and forget the cached reader of the pack. Call with lock held.
+        """
+        cached = ThumbnailPack.readers.pop(filename, None)
+        if cached and cached[1]:
+            cached[1].close()
+
+
+    @staticmethod
+    def build(root: str, filename: str, folder: str, previews: List[str], size: int):
+        """
+        Bring pack up to date with the previews (file names) of folder. The previews are
+        stat'ed, the catalog isn't refreshed when a preview is overwritten. Entries of
+        unchanged previews are copied from the existing pack, the others are read from
+        the thumbnail cache, missing thumbnails are created. Previews whose thumbnail
+        can't be created here (no imbuf) are left out until the loader created it.
+        """
+        try:
+            old = PackReader(filename)
+        except (OSError, ValueError, struct.error, UnicodeDecodeError):
+            old = None
+
+        try:
+            entries, changed = [], False
+            for name in sorted(previews):
+                source = os.path.join(folder, name)
+                try:
+                    mtime = os.stat(source).st_mtime_ns
+                except OSError:
+                    continue
+                if old and old.find(name, mtime):
+                    _, _, _, width, height = old.index[name]
+                    data = old.png(name)
+                else:
+                    located = ThumbnailCache.prepare(root, source, size)
+                    if not located or located[1]:
+                        continue
+                    try:
+                        with open(located[0], "rb") as f:
+                            data = f.read()
+                        width, height = png_size(located[0]) or (0, 0)
+                    except OSError as ex:
+                        print(f"Can't pack thumbnail of {name} ({ex})")
+                        continue
+                    changed = True
+                entries.append((name, mtime, width, height, data))
+
+            if not changed and old and set(old.index) == { e[0] for e in entries }:
+                return
+            tmp = write_pack(filename, entries)
+        finally:
+            if old:
+                old.close()
+
+        # No mapping of the pack may be open while it's replaced.
+        with ThumbnailPack.lock:
+            ThumbnailPack.release(filename)
+            try:
+                os.replace(tmp, filename)
+            except OSError:
+                os.remove(tmp)
+                raise
+
+
+    @staticmethod
+    def update_async(root: str, asset_type: str, category: str, folder: str, previews: List[str], size: int):
+        """
+        Rebuild pack on a background thread. Requests while a build of the same
+        pack is running trigger one more build afterwards. Failed builds are reported
+        on the console, the next request tries again.
+        """
+        filename = ThumbnailPack.pack_file(root, asset_type, category, size)
+        with ThumbnailPack.lock:
+            if filename in ThumbnailPack.building:
+                ThumbnailPack.building[filename] = (folder, previews)
+                return
+            ThumbnailPack.building[filename] = None
+
+        def run(folder, previews):
+            while True:
+                try:
+                    ThumbnailPack.build(root, filename, folder, previews, size)
+                except OSError as ex:
+                    print(f"Can't write thumbnail pack {filename} ({ex})")
+                except Exception:
+                    print(f"Can't build thumbnail pack {filename}")
+                    traceback.print_exc()
+                with ThumbnailPack.lock:
+                    again = ThumbnailPack.building.pop(filename)
+                    if not again:
+                        return
+                    ThumbnailPack.building[filename] = None
+                folder, previews = again
+
+        threading.Thread(target=run, args=(folder, previews), daemon=True).start()
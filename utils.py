@@ -18,7 +18,10 @@ import bpy, os
 
 from . preferences          import PreferencesPanel
 from . icon_helper          import IconHelper
-from typing                 import List, Tuple
+from . catalog              import Catalog, in_subtree
+from . blend_info           import BlendInfoCache, SAVE_INTERVAL
+from . common_utils         import textures_of_node_tree, textures_of_object, textures_of_objects
+from typing                 import Dict, List, Tuple
 
 ASSET_TYPE_OBJECT = "objects"
 ASSET_TYPE_MATERIAL = "materials"
@@ -28,13 +31,58 @@ ASSET_TYPE_NODES_MATERIALS = "nodes_materials"
 
 PREVIEW_EXT = ".png"
 
+# Previews per page of a category.
+PAGE_SIZE = 200
+
+def category_name(name: str, depth: int, asset_number: int) -> str:
+    """
+    Return display name of a category, indented by its depth.
+    """
+    if depth > 1:
+        return f"{(depth - 1) * '.'}/{name} ({asset_number})"
+    else:
+        return f"{name} ({asset_number})"
+
+
 class AssetFolder:
-    def __init__(self, path: str, name: str, depth: int, icon: str = None):
+    """
+    Node of the category structure. Sub folders and asset number are only
+    loaded on first access using loader(folder) -> (asset_number, [AssetFolder, ..]).
+    """
+    __slots__ = ("path", "name", "depth", "loader", "_asset_number", "_folders")
+
+    def __init__(self, path: str, name: str, depth: int, icon: str = None, loader=None):
         self.path = path
         self.name = name
         self.depth = depth
-        self.asset_number = 0
-        self.folders = []
+        self.loader = loader
+        self._asset_number = 0
+        self._folders = None if loader else []
+
+
+    def load(self):
+        if self._folders is None:
+            self._asset_number, self._folders = self.loader(self)
+
+
+    def invalidate(self):
+        """
+        Drop loaded content, it's loaded again on next access.
+        """
+        if self.loader:
+            self._folders = None
+
+
+    @property
+    def folders(self):
+        self.load()
+        return self._folders
+
+
+    @property
+    def asset_number(self):
+        self.load()
+        return self._asset_number
 
 
     def add_folder(self, folder):
@@ -42,14 +90,12 @@ class AssetFolder:
 
 
     def inc_asset_number(self):
-        self.asset_number += 1
+        self.load()
+        self._asset_number += 1
 
 
     def build_name(self) -> str:
-        if self.depth > 1:
-            return f"{(self.depth - 1) * '.'}/{self.name} ({self.asset_number})"
-        else:
-            return f"{self.name} ({self.asset_number})"
+        return category_name(self.name, self.depth, self.asset_number)
 
 
     def get_entries(self, include_root: bool, empty_too: bool) -> List[Tuple[str, str, str]]:
@@ -67,6 +113,20 @@ class AssetFolder:
         return r
 
 
+    def find_loaded(self, path: str):
+        """
+        Return sub folder (any depth) with the given path, only already
+        loaded folders are searched.
+        """
+        for af in self._folders or []:
+            if af.path == path:
+                return af
+            found = af.find_loaded(path)
+            if found:
+                return found
+        return None
+
+
     def get_name_list(self) -> List[str]:
         r = [ self.build_name(), ]
         for af in self.folders:
@@ -93,64 +153,172 @@ def formats_to_parse(asset_type: str) -> List[str]:
 class CategoriesCache:
     """
     Caches the different directory structures, so they must not be parsed that often.
+    Flat lists are memoized and invalidated by a version counter per asset type and
+    the asset root. They are built from the catalog directly, so listing all
+    categories doesn't expand the AssetFolder structure.
     """
     cache = {
         ASSET_TYPE_OBJECT: None,
         ASSET_TYPE_MATERIAL: None
     }
+    version = {
+        ASSET_TYPE_OBJECT: 0,
+        ASSET_TYPE_MATERIAL: 0
+    }
+    # Asset root the structure was built for.
+    roots = {
+        ASSET_TYPE_OBJECT: None,
+        ASSET_TYPE_MATERIAL: None
+    }
+    # (root, asset_type, kind, ..) -> (version, list)
+    memo = {}
+
+    @staticmethod
+    def catalog(asset_type) -> Catalog:
+        return Catalog.get(PreferencesPanel.get().root, asset_type)
+
+
+    @staticmethod
+    def load_folder(asset_type, folder: AssetFolder):
+        """
+        Loader for AssetFolder, returns (asset_number, sub folders) from catalog.
+        """
+        catalog = CategoriesCache.catalog(asset_type)
+        basedir = "" if folder.depth == 0 else folder.path
+        folders = [
+            CategoriesCache.rec_scan_structure(asset_type, os.path.join(basedir, e), folder.depth + 1)
+                for e in catalog.subfolders(basedir)
+        ]
+        return (catalog.file_count(basedir, formats_to_parse(asset_type)), folders)
+
 
     @staticmethod
     def rec_scan_structure(asset_type, basedir="", depth=0) -> AssetFolder:
         """
         Return categories (e.g. sub-dirs) from given asset_type (objects, materials, ...).
+        The structure is read from the catalog, see update_cache for refreshing it.
+        Sub folders are expanded on first access.
         """
         use_icons = PreferencesPanel.get().use_category_icons
-        extensions = formats_to_parse(asset_type)
 
-        path = os.path.join(PreferencesPanel.get().root, asset_type, basedir)
-        if os.path.exists(path):
-            icon = os.path.join(part, "icon.png") if use_icons else None
+        catalog = CategoriesCache.catalog(asset_type)
+        path = os.path.join(catalog.base_path(), basedir)
+        if catalog.exists():
+            icon = os.path.join(path, "icon.png") if use_icons else None
 
-            asset_folder = AssetFolder(
+            return AssetFolder(
                 "<ROOT>" if depth == 0 else basedir, 
                 "<ROOT>" if depth == 0 else os.path.split(path)[1], 
                 depth,
-                icon if icon and os.path.exists(icon) else None
+                icon if icon and os.path.exists(icon) else None,
+                lambda folder: CategoriesCache.load_folder(asset_type, folder)
             )
 
-            for e in sorted(os.listdir(path)):
-                abs_path = os.path.join(path, e)
-
-                if os.path.isdir(abs_path) and not e.startswith('.'):
-                    rel_path = os.path.join(basedir, e)
-                    # Do this recursively
-                    asset_folder.add_folder(CategoriesCache.rec_scan_structure(asset_type, rel_path, depth + 1))
-
-                elif os.path.isfile(abs_path) and e.endswith(extensions):
-                    asset_folder.inc_asset_number()
-
-            return asset_folder
-
         return AssetFolder(path, "<ROOT>", 0)
 
 
     @staticmethod 
     def update_cache(asset_type):
+        """
+        Refresh catalog (only changed directories are listed again) and rebuild structure.
+        """
+        CategoriesCache.catalog(asset_type).refresh()
         CategoriesCache.cache[asset_type] = CategoriesCache.rec_scan_structure(asset_type)
+        CategoriesCache.roots[asset_type] = PreferencesPanel.get().root
+        CategoriesCache.version[asset_type] += 1
 
 
     @staticmethod
-    def categories(asset_type: str):
+    def invalidate(asset_type, changed: List[str]):
+        """
+        Refresh only the given categories (relative folders) in catalog and
+        mark their nodes for reloading, e.g. after a change notification. The
+        categories are scanned again even if their mtime is unchanged, so
+        modified (not added/removed) files are picked up too.
+        """
         if not CategoriesCache.cache[asset_type]:
             CategoriesCache.update_cache(asset_type)
-        return CategoriesCache.cache[asset_type].get_name_list()
+            return
+
+        # Sub folders of changed folders are refreshed anyway.
+        tops = [ c for c in changed if not any(o != c and in_subtree(c, o) for o in changed) ]
+
+        catalog = CategoriesCache.catalog(asset_type)
+        root = CategoriesCache.cache[asset_type]
+        for rel in tops:
+            catalog.refresh(rel, force=True)
+            # A vanished folder changes its parent.
+            while rel and rel not in catalog.folders:
+                rel = os.path.dirname(rel)
+            folder = root if rel == "" else root.find_loaded(rel)
+            if folder:
+                folder.invalidate()
+
+        CategoriesCache.version[asset_type] += 1
 
 
     @staticmethod
-    def categories_enum(asset_type: str, include_root: bool, empty_too: bool):
-        if not CategoriesCache.cache[asset_type]:
+    def memoized(asset_type: str, key: tuple, build):
+        """
+        Return list cached under key (and the current asset root), build() it if outdated.
+        """
+        root = PreferencesPanel.get().root
+        if not CategoriesCache.cache[asset_type] or CategoriesCache.roots[asset_type] != root:
             CategoriesCache.update_cache(asset_type)
-        return CategoriesCache.cache[asset_type].get_entries(include_root, empty_too)
+        version = CategoriesCache.version[asset_type]
+        key = (root, *key)
+        cached = CategoriesCache.memo.get(key)
+        if not cached or cached[0] != version:
+            cached = (version, build())
+            CategoriesCache.memo[key] = cached
+        return cached[1]
+
+
+    @staticmethod
+    def walk(asset_type: str):
+        """
+        Yield (path, name, depth, asset_number) of all categories from the catalog,
+        in the order of the AssetFolder structure (depth first, sorted).
+        """
+        catalog = CategoriesCache.catalog(asset_type)
+        if not catalog.exists():
+            yield (catalog.base_path(), "<ROOT>", 0, 0)
+            return
+
+        extensions = formats_to_parse(asset_type)
+        stack = [ ("", 0) ]
+        while stack:
+            rel, depth = stack.pop()
+            if depth == 0:
+                yield ("<ROOT>", "<ROOT>", 0, catalog.file_count(rel, extensions))
+            else:
+                yield (rel, os.path.basename(rel), depth, catalog.file_count(rel, extensions))
+            stack.extend((os.path.join(rel, d), depth + 1) for d in reversed(catalog.subfolders(rel)))
+
+
+    @staticmethod
+    def categories(asset_type: str):
+        return CategoriesCache.memoized(
+            asset_type,
+            (asset_type, "names"),
+            lambda: [
+                category_name(name, depth, number)
+                    for _, name, depth, number in CategoriesCache.walk(asset_type)
+            ]
+        )
+
+
+    @staticmethod
+    def categories_enum(asset_type: str, include_root: bool, empty_too: bool):
+        return CategoriesCache.memoized(
+            asset_type,
+            (asset_type, "entries", include_root, empty_too),
+            lambda: [
+                (path, "<ROOT>" if depth == 0 else category_name(name, depth, number), path)
+                    for path, name, depth, number in CategoriesCache.walk(asset_type)
+                        if (include_root if depth == 0 else empty_too or number > 0)
+            ]
+        )
 
 
 
@@ -162,6 +330,17 @@ def categories_enum(asset_type, include_root = False, empty_too = False):
     return CategoriesCache.categories_enum(asset_type, include_root, empty_too)    
 
 
+def entry_category(asset_type, entry_name):
+    """
+    Return category (folder relative to asset type folder) of an entry.
+    """
+    rel = os.path.relpath(
+        os.path.dirname(split_entry(entry_name)[0]),
+        os.path.join(PreferencesPanel.get().root, asset_type)
+    )
+    return "" if rel == "." else rel
+
+
 def export_file(asset_type, category, name, ext):
     """
     Return path to file as specified by the individual name parts.
@@ -186,39 +365,68 @@ def parse_entry_list(asset_type, category):
     Parses the given directory for all supported entries.
     In case of materials, parse .blend if it contains more
     than one material and create multiple entries (path/abc.blend::Material).
+    The blend info cache is written at most every SAVE_INTERVAL seconds, callers
+    walking all categories save it once when done.
     """
 
-    path = os.path.join(
-        PreferencesPanel.get().root, 
-        asset_type, 
-        category
-    ) 
+    catalog = CategoriesCache.catalog(asset_type)
+    if not catalog.exists():
+        catalog.refresh()
+
+    path = os.path.join(catalog.base_path(), category) 
+    blend_info = BlendInfoCache.get(catalog.root)
 
     extensions = formats_to_parse(asset_type)
 
     entries = []
     try:
-        for f in os.listdir(path):
-            if f.lower().endswith(extensions):
-                fullname = os.path.join(path, f)
-                if asset_type == ASSET_TYPE_MATERIAL:
-                    # Check if there are more than one material in this file.
-                    with bpy.data.libraries.load(fullname, link=False) as (data_from, data_to):
-                        if len(data_from.materials) > 1:
-                            for mat in data_from.materials:
-                                entries.append(fullname + "::" + mat)
-                        else:
-                            # Single material file.
-                            entries.append(fullname)
+        for f in catalog.files(category, extensions):
+            fullname = os.path.join(path, f)
+            if asset_type == ASSET_TYPE_MATERIAL:
+                # Check if there are more than one material in this file.
+                materials = blend_info.names(fullname, "materials")
+                if len(materials) > 1:
+                    for mat in materials:
+                        entries.append(fullname + "::" + mat)
                 else:
-                    # Object file
+                    # Single material file.
                     entries.append(fullname)
+            else:
+                # Object file
+                entries.append(fullname)
     except Exception as ex:
         print(f"Can't parse: {path}")
+
+    blend_info.save(SAVE_INTERVAL)
     
     return entries
 
 
+def category_previews(asset_type, category) -> Dict[str, int]:
+    """
+    Return { preview file name: mtime_ns } of all previews in the category (from catalog).
+    """
+    catalog = CategoriesCache.catalog(asset_type)
+    return { name: stat[1] for name, stat in catalog.files(category, (PREVIEW_EXT, )).items() }
+
+
+def page_count(entries: int) -> int:
+    """
+    Number of preview pages (at least 1) for the given number of entries.
+    """
+    return max(1, (entries + PAGE_SIZE - 1) // PAGE_SIZE)
+
+
+def entry_page(asset_type, category, entry_name) -> int:
+    """
+    Return preview page of the entry in its category (0 if not found).
+    """
+    try:
+        return parse_entry_list(asset_type, category).index(entry_name) // PAGE_SIZE
+    except ValueError:
+        return 0
+
+
 def split_entry(entry_name):
     """
     Splits the given entry in [(blend/fbx), preview, label, material]
@@ -241,40 +449,3 @@ def blender_2_8x():
     Check if blender 2.8x is used.
     """
     return bpy.app.version < (2, 90, 0)
-
-
-def textures_of_node_tree(nt: bpy.types.NodeTree):
-    """
-    Helper fpr textures_of_object(s).
-    """
-    r = []
-    for n in nt.nodes:
-        if n.bl_idname == 'ShaderNodeTexImage':
-            if n.image and n.image.filepath:
-                r.append(bpy.path.abspath(n.image.filepath))
-        elif n.bl_idname == 'ShaderNodeGroup' and n.node_tree:
-            r.extend(textures_of_node_tree(n.node_tree))
-    return r
-
-
-def textures_of_object(obj: bpy.types.Object):
-    """
-    Helper fpr textures_of_objects.
-    """
-    r = []
-    for ms in obj.material_slots:
-        if ms.material and ms.material.node_tree:
-            r.extend(textures_of_node_tree(ms.material.node_tree))
-    return r
-
-
-def textures_of_objects(objects: List[bpy.types.Object]):
-    """
-    Get all image textures used by all materials from all objects as set.
-    """
-    r = []
-    for o in objects:
-        r.extend(textures_of_object(o))
-    return set(r)
-
-   
\ No newline at end of file